@@ -0,0 +1,139 @@
+import datetime
+
+from django.contrib import admin
+from django.db.models import Sum
+from django.utils import timezone
+
+# Register your models here.
+from analytics.models import DailySales, Dimension, HourlySales, RollupWatermark
+from analytics.rollups import WATERMARK
+
+
+DASHBOARD_DAYS = 30
+DASHBOARD_HOURS = 48
+TOP_LIMIT = 10
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(ReadOnlyAdmin):
+    """Sales dashboard; every figure comes from the rollup tables."""
+    change_list_template = 'admin/analytics/dailysales/change_list.html'
+    list_display = [
+        'day',
+        'dimension',
+        'label',
+        'orders',
+        'units',
+        'revenue',
+        'margin',
+    ]
+    list_filter = ['dimension', 'day']
+    date_hierarchy = 'day'
+    search_fields = ['label']
+
+    def totals(self, queryset):
+        return queryset.aggregate(
+            orders=Sum('orders'),
+            units=Sum('units'),
+            revenue=Sum('revenue'),
+            cost=Sum('cost'),
+            margin=Sum('margin'),
+        )
+
+    def ranking(self, queryset, limit=TOP_LIMIT):
+        return queryset.values('key').annotate(
+            units=Sum('units'),
+            revenue=Sum('revenue'),
+            margin=Sum('margin'),
+        ).order_by('-revenue')[:limit]
+
+    def with_labels(self, rows, queryset):
+        # Later days win, so renamed products show their current name.
+        rows = list(rows)
+        labels = dict(
+            queryset.filter(key__in=[row['key'] for row in rows])
+            .order_by('key', 'day')
+            .values_list('key', 'label')
+        )
+        for row in rows:
+            row['label'] = labels.get(row['key'], row['key'])
+        return rows
+
+    def dashboard(self):
+        today = timezone.localdate()
+        since = today - datetime.timedelta(days=DASHBOARD_DAYS - 1)
+        recent = DailySales.objects.filter(day__gte=since)
+        # Each order has exactly one payment type, so that dimension adds
+        # up to the store-wide totals.
+        by_payment = recent.filter(dimension=Dimension.PAYMENT_TYPE)
+        products = recent.filter(dimension=Dimension.PRODUCT)
+        categories = recent.filter(dimension=Dimension.CATEGORY)
+
+        hours_since = timezone.now() - datetime.timedelta(hours=DASHBOARD_HOURS)
+        hourly = HourlySales.objects.filter(
+            dimension=Dimension.PAYMENT_TYPE,
+            hour__gte=hours_since,
+        ).values('hour').annotate(
+            orders=Sum('orders'),
+            revenue=Sum('revenue'),
+        ).order_by('-hour')
+
+        watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+        return {
+            'days': DASHBOARD_DAYS,
+            'hours': DASHBOARD_HOURS,
+            'totals': self.totals(by_payment),
+            'daily': by_payment.values('day').annotate(
+                orders=Sum('orders'),
+                revenue=Sum('revenue'),
+                margin=Sum('margin'),
+            ).order_by('-day'),
+            'hourly': hourly,
+            'payment_types': self.with_labels(
+                self.ranking(by_payment), by_payment
+            ),
+            'top_products': self.with_labels(
+                self.ranking(products), products
+            ),
+            'top_categories': self.with_labels(
+                self.ranking(categories), categories
+            ),
+            'watermark': watermark.value if watermark else None,
+        }
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['dashboard'] = self.dashboard()
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(HourlySales)
+class HourlySalesAdmin(ReadOnlyAdmin):
+    list_display = [
+        'hour',
+        'dimension',
+        'label',
+        'orders',
+        'units',
+        'revenue',
+        'margin',
+    ]
+    list_filter = ['dimension']
+    date_hierarchy = 'hour'
+    search_fields = ['label']
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(ReadOnlyAdmin):
+    list_display = ['name', 'value', 'updated_at']
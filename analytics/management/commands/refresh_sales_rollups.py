@@ -0,0 +1,45 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-aggregate the hourly and daily sales rollups for every day '
+        'with orders changed since the last run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the watermark and rebuild every day with orders.',
+        )
+        parser.add_argument(
+            '--lag',
+            type=int,
+            default=60,
+            help='Leave orders updated in the last N seconds for next time.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(day, hourly, daily):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f"{day}: {hourly} hourly and {daily} daily rows"
+                )
+
+        days = refresh_sales_rollups(
+            lag=datetime.timedelta(seconds=options['lag']),
+            full=options['full'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {days} days of sales rollups in "
+            f"{time.monotonic() - started:.1f}s."
+        ))
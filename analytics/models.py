@@ -0,0 +1,73 @@
+from django.db import models
+
+# Create your models here.
+
+
+class Dimension(models.TextChoices):
+    PRODUCT = 'product', 'Product'
+    CATEGORY = 'category', 'Category'
+    PAYMENT_TYPE = 'payment_type', 'Payment type'
+
+
+class SalesRollup(models.Model):
+    """Sales of one product, category or payment type in one period.
+
+    ``key`` is the product or category id, or the payment type; ``label``
+    keeps the name it had when the period was last rolled up, so reports
+    never need to join back to the catalog.
+    """
+    dimension = models.CharField(max_length=20, choices=Dimension.choices)
+    key = models.CharField(max_length=64)
+    label = models.CharField(max_length=255, blank=True)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    margin = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(SalesRollup):
+    day = models.DateField()
+
+    class Meta:
+        verbose_name = 'Daily sales'
+        verbose_name_plural = 'Daily sales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dimension', 'day', 'key'],
+                name='daily_sales_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.get_dimension_display()}: {self.label}"
+
+
+class HourlySales(SalesRollup):
+    hour = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Hourly sales'
+        verbose_name_plural = 'Hourly sales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dimension', 'hour', 'key'],
+                name='hourly_sales_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.hour} {self.get_dimension_display()}: {self.label}"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
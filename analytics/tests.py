@@ -0,0 +1,137 @@
+import datetime
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from analytics.models import DailySales, Dimension, HourlySales
+from analytics.rollups import refresh_sales_rollups
+from orders.models import Order, OrderItem, Payment
+from products.tests import seed_catalog
+
+
+NO_LAG = datetime.timedelta(0)
+
+
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, products = seed_catalog(count=2)
+        cls.variants = [product.variants.first() for product in products]
+        cls.day = timezone.localdate() - datetime.timedelta(days=1)
+
+    def place_order(self, hour, payment_type, status=Order.Status.PENDING,
+                    quantity=1, variant=None):
+        """An order placed on ``self.day`` at ``hour`` and last saved an
+        hour ago, i.e. outside the refresh lag."""
+        order = Order.objects.create(status=status)
+        OrderItem.objects.create(
+            order=order,
+            variant=variant or self.variants[0],
+            quantity=quantity,
+            unit_price=Decimal('10'),
+        )
+        Payment.objects.create(order=order, payment_type=payment_type)
+        placed_at = timezone.make_aware(
+            datetime.datetime.combine(self.day, datetime.time(hour, 30))
+        )
+        Order.objects.filter(pk=order.pk).update(
+            created_at=placed_at,
+            updated_at=timezone.now() - datetime.timedelta(hours=1),
+        )
+        order.refresh_from_db()
+        return order
+
+    def daily(self, dimension=Dimension.CATEGORY, key=None):
+        if key is None:
+            key = str(self.category.pk)
+        return DailySales.objects.filter(
+            day=self.day,
+            dimension=dimension,
+            key=key,
+        ).first()
+
+    def test_daily_is_the_sum_of_hourly(self):
+        self.place_order(10, Payment.PaymentType.COD, quantity=2)
+        self.place_order(
+            14,
+            Payment.PaymentType.COD,
+            quantity=3,
+            variant=self.variants[1],
+        )
+
+        self.assertEqual(refresh_sales_rollups(), 1)
+
+        for daily in DailySales.objects.filter(day=self.day):
+            hourly = HourlySales.objects.filter(
+                dimension=daily.dimension,
+                key=daily.key,
+            ).aggregate(
+                orders=Sum('orders'),
+                units=Sum('units'),
+                revenue=Sum('revenue'),
+                margin=Sum('margin'),
+            )
+            self.assertEqual(hourly, {
+                'orders': daily.orders,
+                'units': daily.units,
+                'revenue': daily.revenue,
+                'margin': daily.margin,
+            })
+        category = self.daily()
+        self.assertEqual((category.orders, category.units), (2, 5))
+        self.assertEqual(category.revenue, Decimal('50'))
+        self.assertEqual(
+            HourlySales.objects.filter(dimension=Dimension.CATEGORY).count(),
+            2,
+        )
+
+    def test_recent_changes_wait_for_the_lag(self):
+        refresh_sales_rollups()
+        order = self.place_order(10, Payment.PaymentType.COD)
+        Order.objects.filter(pk=order.pk).update(updated_at=timezone.now())
+
+        self.assertEqual(refresh_sales_rollups(), 0)
+        self.assertIsNone(self.daily())
+
+        self.assertEqual(refresh_sales_rollups(lag=NO_LAG), 1)
+        self.assertEqual(self.daily().orders, 1)
+
+    def test_late_cancellation_is_picked_up(self):
+        self.place_order(10, Payment.PaymentType.COD, quantity=2)
+        order = self.place_order(11, Payment.PaymentType.COD)
+        refresh_sales_rollups()
+        self.assertEqual(self.daily().orders, 2)
+
+        order.status = Order.Status.CANCELED
+        order.save()
+
+        self.assertEqual(refresh_sales_rollups(lag=NO_LAG), 1)
+        category = self.daily()
+        self.assertEqual((category.orders, category.units), (1, 2))
+        # The canceled order's hour is gone rather than left at zero.
+        self.assertEqual(
+            HourlySales.objects.filter(dimension=Dimension.CATEGORY).count(),
+            1,
+        )
+
+    def test_late_payment_is_picked_up(self):
+        order = self.place_order(10, Payment.PaymentType.SSLCOMMERZ)
+        refresh_sales_rollups()
+        # Online orders don't count until they are paid.
+        self.assertIsNone(self.daily())
+
+        Payment.objects.filter(order=order).update(
+            status=Payment.Status.PAID,
+        )
+        order.status = Order.Status.CONFIRMED
+        order.save()
+
+        self.assertEqual(refresh_sales_rollups(lag=NO_LAG), 1)
+        self.assertEqual(self.daily().orders, 1)
+        payment_type = self.daily(
+            Dimension.PAYMENT_TYPE,
+            Payment.PaymentType.SSLCOMMERZ,
+        )
+        self.assertEqual(payment_type.revenue, Decimal('10'))
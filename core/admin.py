@@ -1,3 +1,29 @@
 from django.contrib import admin
+from django.utils import timezone
 
 # Register your models here.
+from core.models import OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = [
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at',
+        'created_at',
+    ]
+    list_filter = ['status']
+    search_fields = ['subject']
+    readonly_fields = ['attempts', 'last_error', 'sent_at', 'created_at']
+    actions = ['retry_now']
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboxEmail.Status.SENT).update(
+            status=OutboxEmail.Status.PENDING,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f"{updated} emails queued for retry.")
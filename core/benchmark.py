@@ -0,0 +1,21 @@
+"""Helpers shared by the benchmark commands."""
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency percentiles (ms) of one run."""
+    if not latencies:
+        return {'requests': 0, 'rps': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    latencies = [latency * 1000 for latency in latencies]
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+    }
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    """Current version number of ``name`` in the shared cache.
+
+    Every process reads the same counter, so bumping it from one worker
+    invalidates whatever the other workers derived from the old version.
+    """
+    key = version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def get_versions(*names):
+    """``get_version`` for several names with a single cache round trip."""
+    keys = {version_key(name): name for name in names}
+    found = cache.get_many(list(keys))
+    return [
+        found[key] if key in found else get_version(name)
+        for key, name in keys.items()
+    ]
+
+
+def bump_version(name):
+    key = version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+        return cache.incr(key)
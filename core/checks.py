@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            'The default cache is not shared between processes.',
+            hint=(
+                'Cache invalidation (core.cache_versions) and the payment '
+                'callback lock only work across workers with a shared '
+                'cache such as the database cache, Redis or Memcached.'
+            ),
+            id='core.W001',
+        )]
+    return []
@@ -0,0 +1,163 @@
+"""Lightweight in-process domain event bus.
+
+``emit`` only appends a dict to a bounded ring buffer (after the current
+transaction commits, so rolled back work never produces events). A daemon
+thread drains the buffer in batches to the sink configured in
+``DOMAIN_EVENTS``: a JSONL file, the ``core.DomainEvent`` table, or nothing.
+Requests therefore never wait on event I/O. If the sink falls behind, the
+oldest events are dropped and counted rather than growing memory.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_buffer = None
+_wakeup = threading.Event()
+_worker = None
+_dropped = 0
+
+
+def get_config():
+    return settings.DOMAIN_EVENTS
+
+
+class JsonlSink:
+    """Append events to a file, one JSON document per line.
+
+    Each line goes out in a single ``os.write`` on an ``O_APPEND``
+    descriptor, so lines from several worker processes sharing the file
+    never interleave the way a buffered handle's partial flushes can.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def write(self, events):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            for event in events:
+                line = json.dumps(event, cls=DjangoJSONEncoder) + '\n'
+                os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+
+
+class DatabaseSink:
+    def write(self, events):
+        from core.models import DomainEvent
+
+        close_old_connections()
+        DomainEvent.objects.bulk_create([
+            DomainEvent(
+                name=event['name'],
+                payload=event['data'],
+                occurred_at=event['occurred_at'],
+            )
+            for event in events
+        ])
+
+
+class NullSink:
+    def write(self, events):
+        pass
+
+
+def get_sink():
+    config = get_config()
+    sink = config.get('SINK')
+    if sink == 'jsonl':
+        return JsonlSink(config['PATH'])
+    if sink == 'db':
+        return DatabaseSink()
+    return NullSink()
+
+
+def _get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _lock:
+            if _buffer is None:
+                _buffer = deque(maxlen=get_config()['BUFFER_SIZE'])
+    return _buffer
+
+
+def _append(event):
+    global _dropped
+    buffer = _get_buffer()
+    if len(buffer) == buffer.maxlen:
+        _dropped += 1
+    buffer.append(event)
+    _ensure_worker()
+    if len(buffer) >= get_config()['BATCH_SIZE']:
+        _wakeup.set()
+
+
+def emit(name, **data):
+    """Queue a ``name`` event with JSON-serializable ``data``.
+
+    Inside a transaction the event is only queued once it commits.
+    """
+    if not get_config().get('SINK'):
+        return
+    event = {'name': name, 'occurred_at': timezone.now(), 'data': data}
+    transaction.on_commit(lambda: _append(event))
+
+
+def flush(sink=None):
+    """Write everything buffered so far; returns the number of events."""
+    global _dropped
+
+    buffer = _get_buffer()
+    sink = sink or get_sink()
+    batch_size = get_config()['BATCH_SIZE']
+    written = 0
+    while buffer:
+        batch = []
+        while buffer and len(batch) < batch_size:
+            batch.append(buffer.popleft())
+        try:
+            sink.write(batch)
+            written += len(batch)
+        except Exception:
+            logger.exception('Dropped %d domain events', len(batch))
+    if _dropped:
+        logger.warning('Event buffer overflowed; lost %d events', _dropped)
+        _dropped = 0
+    return written
+
+
+def _drain():
+    sink = get_sink()
+    interval = get_config()['FLUSH_INTERVAL']
+    while True:
+        _wakeup.wait(interval)
+        _wakeup.clear()
+        flush(sink)
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_drain,
+                name='domain-events',
+                daemon=True,
+            )
+            _worker.start()
+            atexit.register(flush)
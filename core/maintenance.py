@@ -0,0 +1,157 @@
+"""Batched clean-up of rows nobody will read again.
+
+Each task deletes in primary-key batches of ``PURGE_BATCH_SIZE`` with a
+pause of ``PURGE_BATCH_PAUSE`` seconds in between, so a large backlog never
+holds the database write lock (or grows SQLite's WAL) for long and normal
+traffic keeps flowing while it runs.
+"""
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core.models import OutboxEmail
+from customers.models import ResetPassword
+from products.models import Cart, CartItem
+
+
+logger = logging.getLogger(__name__)
+
+
+def raw_delete(model, column, values):
+    """``DELETE ... WHERE column IN values`` without loading the rows.
+
+    Bypasses the ORM's collector and signals on purpose: cart lines being
+    purged must not trigger per-row total recalculation.
+    """
+    if not values:
+        return 0
+    connection = connections[model.objects.db]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(column)
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {column} IN ({placeholders})",
+            list(values),
+        )
+        return cursor.rowcount
+
+
+def purge_in_batches(queryset, delete_batch, batch_size, pause):
+    """Run ``delete_batch(pks)`` until ``queryset`` is empty.
+
+    Returns the number of rows deleted and batches run.
+    """
+    deleted = batches = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        with transaction.atomic(using=queryset.db):
+            deleted += delete_batch(pks)
+        batches += 1
+        if len(pks) < batch_size:
+            break
+        time.sleep(pause)
+    return deleted, batches
+
+
+def stale_guest_carts(now):
+    cutoff = now - datetime.timedelta(days=settings.GUEST_CART_RETENTION_DAYS)
+    return Cart.objects.filter(customer__isnull=True, updated_at__lt=cutoff)
+
+
+def delete_carts(pks):
+    # Counts carts only; their lines go with them.
+    raw_delete(CartItem, 'cart_id', pks)
+    return raw_delete(Cart, 'id', pks)
+
+
+def expired_sessions(now):
+    return Session.objects.filter(expire_date__lt=now)
+
+
+def delete_sessions(pks):
+    return Session.objects.filter(pk__in=pks).delete()[0]
+
+
+def stale_reset_tokens(now):
+    cutoff = now - datetime.timedelta(
+        hours=settings.RESET_TOKEN_RETENTION_HOURS
+    )
+    return ResetPassword.objects.filter(created_at__lt=cutoff)
+
+
+def used_reset_tokens(now):
+    return ResetPassword.objects.filter(is_used=True)
+
+
+def delete_reset_tokens(pks):
+    return ResetPassword.objects.filter(pk__in=pks).delete()[0]
+
+
+def sent_emails(now):
+    cutoff = now - datetime.timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    return OutboxEmail.objects.filter(
+        status=OutboxEmail.Status.SENT,
+        sent_at__lt=cutoff,
+    )
+
+
+def delete_emails(pks):
+    return raw_delete(OutboxEmail, 'id', pks)
+
+
+TASKS = {
+    'carts': [(stale_guest_carts, delete_carts)],
+    'sessions': [(expired_sessions, delete_sessions)],
+    'reset_tokens': [
+        (stale_reset_tokens, delete_reset_tokens),
+        (used_reset_tokens, delete_reset_tokens),
+    ],
+    'emails': [(sent_emails, delete_emails)],
+}
+
+
+def purge_stale_data(tasks=None, batch_size=None, pause=None, dry_run=False):
+    """Run the named clean-up ``tasks`` (all of them by default).
+
+    Returns ``{task: {'rows': ..., 'batches': ..., 'seconds': ...}}``; with
+    ``dry_run`` only the rows that would go are counted.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_BATCH_PAUSE if pause is None else pause
+    now = timezone.now()
+    results = {}
+
+    for name in tasks or TASKS:
+        started = time.monotonic()
+        rows = batches = 0
+        for select, delete_batch in TASKS[name]:
+            queryset = select(now)
+            if dry_run:
+                rows += queryset.count()
+                continue
+            deleted, runs = purge_in_batches(
+                queryset, delete_batch, batch_size, pause
+            )
+            rows += deleted
+            batches += runs
+
+        results[name] = {
+            'rows': rows,
+            'batches': batches,
+            'seconds': time.monotonic() - started,
+        }
+        logger.info(
+            'purge %s: %d rows in %d batches (%.2fs)%s',
+            name, rows, batches, results[name]['seconds'],
+            ' [dry run]' if dry_run else '',
+            extra={'purge_task': name, 'purge_rows': rows},
+        )
+    return results
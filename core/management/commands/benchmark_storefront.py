@@ -0,0 +1,424 @@
+import datetime
+import json
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import partial
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from core.benchmark import summarize
+from core.middleware import QueryRecorder
+from products.models import Category, Product, ProductVariant
+from products.pagination import CursorPaginator
+from products.signals import refresh_product_indexes
+from products.views import ProductListView
+
+
+class ClientDriver:
+    """Requests through the Django test client, in this process."""
+
+    def __init__(self, host):
+        self.client = Client(raise_request_exception=False, HTTP_HOST=host)
+
+    def request(self, method, path, data=None):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = getattr(self.client, method)(path, data)
+        latency = time.perf_counter() - started
+        return response.status_code, latency, recorder.count
+
+    def close(self):
+        connection.close()
+
+
+class HttpDriver:
+    """Requests against a running server. Query counts come from the
+    ``X-Query-Count`` header, which the server only sends with DEBUG on."""
+
+    def __init__(self, base_url, csrf_path):
+        self.base_url = base_url
+        self.csrf_path = csrf_path
+        self.session = requests.Session()
+
+    def request(self, method, path, data=None):
+        url = urljoin(self.base_url, path)
+        headers = {}
+        if method == 'post':
+            if 'csrftoken' not in self.session.cookies:
+                # Any page with a form sets the cookie.
+                self.session.get(urljoin(self.base_url, self.csrf_path))
+            headers = {
+                'X-CSRFToken': self.session.cookies.get('csrftoken', ''),
+                'Referer': url,
+            }
+        started = time.perf_counter()
+        response = self.session.request(
+            method,
+            url,
+            params=data if method == 'get' else None,
+            data=data if method == 'post' else None,
+            headers=headers,
+            allow_redirects=False,
+            timeout=30,
+        )
+        latency = time.perf_counter() - started
+        queries = response.headers.get('X-Query-Count')
+        return (
+            response.status_code,
+            latency,
+            int(queries) if queries else None,
+        )
+
+    def close(self):
+        self.session.close()
+
+
+def add_to_cart(driver, data, i):
+    product_id, variant_id = data['variants'][i % len(data['variants'])]
+    return driver.request(
+        'post',
+        reverse('add_to_cart', args=[product_id]),
+        {'variant_id': variant_id, 'quantity': 1},
+    )
+
+
+def checkout(driver, data, i):
+    return driver.request('post', reverse('checkout'), {
+        'payment_type': 'cod',
+        'first_name': 'Bench',
+        'last_name': 'Shopper',
+        'address_line1': '1 Benchmark Road',
+        'city': 'Dhaka',
+    })
+
+
+# name -> (setup run once per worker, preparation run before every step,
+# timed step). Setup and preparation are not timed, and a failed one
+# counts as an error.
+SCENARIOS = {
+    'index': (
+        None,
+        None,
+        lambda d, data, i: d.request('get', reverse('index')),
+    ),
+    'product_list': (
+        None,
+        None,
+        lambda d, data, i: d.request('get', reverse('product_list')),
+    ),
+    'product_list_deep_page': (
+        None,
+        None,
+        lambda d, data, i: d.request(
+            'get', reverse('product_list'), {'page': data['deep_page']}
+        ),
+    ),
+    'product_list_deep_cursor': (
+        None,
+        None,
+        lambda d, data, i: d.request(
+            'get', reverse('product_list'), {'cursor': data['deep_cursor']}
+        ),
+    ),
+    'product_list_category': (
+        None,
+        None,
+        lambda d, data, i: d.request('get', reverse('product_list'), {
+            'category': data['categories'][i % len(data['categories'])],
+        }),
+    ),
+    'product_detail': (
+        None,
+        None,
+        lambda d, data, i: d.request('get', reverse(
+            'product_detail',
+            args=[data['variants'][i % len(data['variants'])][0]],
+        )),
+    ),
+    'add_to_cart': (None, None, add_to_cart),
+    'cart': (
+        lambda d, data: add_to_cart(d, data, 0),
+        None,
+        lambda d, data, i: d.request('get', reverse('cart')),
+    ),
+    'checkout_cod': (None, add_to_cart, checkout),
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the storefront: throughput, p50/p95/p99 latency and '
+        'queries per request for each page, optionally compared with an '
+        'earlier run. Places real carts and COD orders, so point it at a '
+        'scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            help='Benchmark a running server (e.g. http://127.0.0.1:8000/) '
+                 'instead of the in-process test client.',
+        )
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Timed requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Untimed requests per worker and scenario.')
+        parser.add_argument(
+            '--scenarios',
+            help=f"Comma separated subset of: {', '.join(SCENARIOS)}.",
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Top the catalog up to this many active products first.',
+        )
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument(
+            '--compare',
+            help='JSON from an earlier run to show the change against.',
+        )
+
+    def handle(self, *args, **options):
+        names = list(SCENARIOS)
+        if options['scenarios']:
+            names = [name.strip() for name in options['scenarios'].split(',')]
+            unknown = set(names) - set(SCENARIOS)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+
+        if options['seed']:
+            self.seed(options['seed'])
+        data = self.sample_data()
+
+        if options['base_url']:
+            make_driver = partial(
+                HttpDriver,
+                options['base_url'],
+                reverse('product_detail', args=[data['variants'][0][0]]),
+            )
+        else:
+            make_driver = partial(ClientDriver, self.client_host())
+
+        results = {}
+        for name in names:
+            results[name] = self.run_scenario(
+                SCENARIOS[name], make_driver, data, options
+            )
+            self.report(name, results[name], baseline)
+        # The workers' connections are closed, but not this thread's.
+        connections.close_all()
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump({
+                    'revision': git_revision(),
+                    'created_at': datetime.datetime.now(
+                        datetime.timezone.utc
+                    ).isoformat(),
+                    'mode': options['base_url'] or 'test-client',
+                    'concurrency': options['concurrency'],
+                    'scenarios': results,
+                }, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+    def client_host(self):
+        for host in settings.ALLOWED_HOSTS:
+            host = host.lstrip('.')
+            if host and host != '*':
+                return host
+        return 'localhost'
+
+    def seed(self, count):
+        missing = count - Product.objects.filter(is_active=True).count()
+        if missing <= 0:
+            return
+        self.stdout.write(f'Seeding {missing} products...')
+        categories = [
+            Category.objects.get_or_create(
+                slug=f'bench-{i}', defaults={'name': f'Bench {i}'}
+            )[0]
+            for i in range(10)
+        ]
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Bench product {i}',
+                category=categories[i % len(categories)],
+                buying_price=Decimal('5'),
+                base_price=Decimal('10'),
+            )
+            for i in range(missing)
+        ], batch_size=500)
+        ProductVariant.objects.bulk_create([
+            ProductVariant(
+                product=product,
+                size=size,
+                color='black',
+                stock=1000000,
+            )
+            for product in products
+            for size in ('M', 'L')
+        ], batch_size=500)
+        refresh_product_indexes([product.pk for product in products])
+
+    def sample_data(self):
+        products = Product.objects.filter(is_active=True).order_by(
+            '-created_at', '-id'
+        )
+        total = products.count()
+        if not total:
+            raise CommandError('No active products; run with --seed.')
+        variants = list(
+            ProductVariant.objects.filter(
+                is_active=True,
+                product__is_active=True,
+                stock__gt=0,
+            ).values_list('product_id', 'pk')[:500]
+        )
+        if not variants:
+            raise CommandError('No product variants in stock.')
+
+        # Nine tenths of the way down the listing.
+        offset = total * 9 // 10
+        per_page = ProductListView.paginate_by
+        return {
+            'variants': variants,
+            'categories': list(
+                Category.objects.filter(
+                    is_active=True, products__isnull=False
+                ).exclude(slug=None).values_list('slug', flat=True).distinct()
+            ) or [''],
+            'deep_page': offset // per_page + 1,
+            'deep_cursor': CursorPaginator(products, per_page).encode_cursor(
+                products[offset], 'next'
+            ),
+        }
+
+    def run_scenario(self, scenario, make_driver, data, options):
+        setup, prepare, step = scenario
+        concurrency = options['concurrency']
+        counter = iter(range(options['requests']))
+        lock = threading.Lock()
+        samples = []
+        errors = 0
+        started = []
+        # Per worker: time spent in the timed loop minus preparation.
+        busy = []
+        # Timing starts once every worker has set up and warmed up.
+        ready = threading.Barrier(
+            concurrency,
+            action=lambda: started.append(time.perf_counter()),
+        )
+
+        def run(action, driver, *args):
+            try:
+                status, latency, queries = action(driver, data, *args)
+            except Exception:
+                return None
+            if status >= 400:
+                return None
+            return latency, queries
+
+        def worker():
+            nonlocal errors
+            driver = make_driver()
+            try:
+                if setup and run(setup, driver) is None:
+                    with lock:
+                        errors += 1
+                for i in range(options['warmup']):
+                    if prepare is None or run(prepare, driver, i) is not None:
+                        run(step, driver, i)
+                ready.wait()
+
+                preparing = 0.0
+                while True:
+                    with lock:
+                        i = next(counter, None)
+                    if i is None:
+                        break
+                    sample = None
+                    prepared = prepare is None
+                    if not prepared:
+                        before = time.perf_counter()
+                        prepared = run(prepare, driver, i) is not None
+                        preparing += time.perf_counter() - before
+                    if prepared:
+                        sample = run(step, driver, i)
+                    with lock:
+                        if sample is None:
+                            errors += 1
+                        else:
+                            samples.append(sample)
+                with lock:
+                    busy.append(
+                        time.perf_counter() - started[0] - preparing
+                    )
+            finally:
+                driver.close()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        elapsed = max(busy) if busy else 0.0
+
+        result = summarize([latency for latency, _ in samples], elapsed)
+        counts = [queries for _, queries in samples if queries is not None]
+        result['errors'] = errors
+        result['queries'] = sum(counts) / len(counts) if counts else None
+        return result
+
+    def report(self, name, result, baseline):
+        queries = result['queries']
+        line = (
+            f"{name:<26} {result['rps']:8.1f} req/s  "
+            f"p50 {result['p50']:7.1f}ms  p95 {result['p95']:7.1f}ms  "
+            f"p99 {result['p99']:7.1f}ms  "
+            f"{'-' if queries is None else f'{queries:.1f}'} queries"
+        )
+        if result['errors']:
+            line += f"  {result['errors']} errors"
+        self.stdout.write(line)
+
+        previous = (baseline or {}).get('scenarios', {}).get(name)
+        if previous:
+            changes = []
+            for key, label in (('rps', 'req/s'), ('p50', 'p50'),
+                               ('p95', 'p95'), ('p99', 'p99')):
+                if previous[key]:
+                    change = (result[key] - previous[key]) / previous[key]
+                    changes.append(f'{label} {change:+.0%}')
+            if queries is not None and previous.get('queries') is not None:
+                changes.append(
+                    f"queries {queries - previous['queries']:+.1f}"
+                )
+            self.stdout.write(f"{'':<26} vs baseline: {', '.join(changes)}")
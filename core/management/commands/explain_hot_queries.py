@@ -0,0 +1,272 @@
+import datetime
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from customers.models import Address, Customer, ResetPassword
+from orders.models import Order, Payment
+from products.models import Cart, Category, Product
+
+
+# (label, indexes that serve it, queryset builder). Each queryset mirrors
+# the lookup its view or job actually runs.
+HOT_QUERIES = [
+    (
+        'Guest cart by session (AddToCartView)',
+        [(Cart, 'cart_session_idx')],
+        lambda ctx: Cart.objects.filter(session_id=ctx['session_key']),
+    ),
+    (
+        "Customer's cart (cart_service)",
+        [],
+        lambda ctx: Cart.objects.filter(customer=ctx['customer_id'])[:1],
+    ),
+    (
+        'Reset token (ResetPassword)',
+        [(ResetPassword, 'resetpassword_token_idx')],
+        lambda ctx: ResetPassword.objects.filter(token=ctx['token']),
+    ),
+    (
+        'Product listing (ProductListView)',
+        [],
+        lambda ctx: Product.objects.filter(is_active=True).order_by(
+            '-created_at', '-id'
+        )[:24],
+    ),
+    (
+        'Category listing (ProductListView)',
+        [(Product, 'product_active_category_idx')],
+        lambda ctx: Product.objects.filter(
+            is_active=True,
+            category_id__in=[ctx['category_id']],
+        ).order_by('-created_at', '-id')[:24],
+    ),
+    (
+        'Latest address (CheckoutView)',
+        [(Address, 'address_customer_recent_idx')],
+        lambda ctx: Address.objects.filter(
+            customer=ctx['customer_id']
+        ).order_by('-updated_at')[:1],
+    ),
+    (
+        'Changed orders (refresh_sales_rollups)',
+        [(Order, 'order_updated_idx')],
+        lambda ctx: Order.objects.filter(
+            updated_at__gt=ctx['since'],
+            updated_at__lte=ctx['now'],
+        ).dates('created_at', 'day'),
+    ),
+    (
+        'Pending payments (reconcile_payments)',
+        [(Payment, 'payment_pending_idx')],
+        lambda ctx: Payment.objects.filter(
+            status=Payment.Status.PENDING,
+            payment_type=Payment.PaymentType.SSLCOMMERZ,
+            tran_id__isnull=False,
+            created_at__lt=ctx['now'],
+            pk__gt=0,
+        ).order_by('pk')[:100],
+    ),
+]
+
+
+def full_scans(plan):
+    """Plan lines that read a whole table instead of an index."""
+    return [
+        line.strip() for line in plan.splitlines()
+        if 'Seq Scan' in line
+        or (' SCAN ' in f' {line} ' and 'USING' not in line
+            and 'CONSTANT' not in line)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed sample data and show the query plan and timing of every hot '
+        'lookup with and without its index. Everything runs in a '
+        'transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=20000,
+            help='Rows to seed per table (0 to use the existing data).',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=200,
+            help='Executions per query when timing.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['scale']:
+                self.stdout.write(f"Seeding {options['scale']} rows...")
+                self.seed(options['scale'])
+            ctx = self.sample_context()
+            self.analyze()
+            after = self.measure(ctx, options['repeat'])
+
+            before = None
+            if connection.features.can_rollback_ddl:
+                self.drop_indexes()
+                self.analyze()
+                before = self.measure(ctx, options['repeat'])
+            else:
+                self.stdout.write(self.style.WARNING(
+                    'This database cannot roll back DDL; only the plans '
+                    'with the indexes are shown.'
+                ))
+
+            transaction.set_rollback(True)
+
+        self.report(before, after)
+
+    def seed(self, scale):
+        now = timezone.now()
+        categories = Category.objects.bulk_create([
+            Category(name=f'Bench category {i}', slug=f'bench-{uuid.uuid4()}')
+            for i in range(20)
+        ])
+        Product.objects.bulk_create([
+            Product(
+                name=f'Bench product {i}',
+                category=categories[i % len(categories)],
+                buying_price=Decimal('1'),
+                base_price=Decimal('10'),
+                is_active=i % 10 != 0,
+            )
+            for i in range(scale)
+        ], batch_size=1000)
+
+        users = User.objects.bulk_create([
+            User(username=f'bench-{uuid.uuid4()}', email=f'b{i}@example.com')
+            for i in range(scale)
+        ], batch_size=1000)
+        customers = Customer.objects.bulk_create([
+            Customer(user=user) for user in users
+        ], batch_size=1000)
+
+        Cart.objects.bulk_create([
+            Cart(session_id=uuid.uuid4().hex) for _ in range(scale)
+        ] + [
+            Cart(customer=customer) for customer in customers
+        ], batch_size=1000)
+        Address.objects.bulk_create([
+            Address(customer=customer, address_line1=f'{i} Bench street')
+            for i, customer in enumerate(customers * 2)
+        ], batch_size=1000)
+        ResetPassword.objects.bulk_create([
+            ResetPassword(user=user, token=str(uuid.uuid4()))
+            for user in users
+        ], batch_size=1000)
+
+        orders = Order.objects.bulk_create([
+            Order(
+                customer=customers[i % len(customers)],
+                total=Decimal('10'),
+                status=Order.Status.CONFIRMED,
+            )
+            for i in range(scale)
+        ], batch_size=1000)
+        Payment.objects.bulk_create([
+            Payment(
+                order=order,
+                payment_type=Payment.PaymentType.SSLCOMMERZ,
+                amount=order.total,
+                status=(
+                    Payment.Status.PENDING if i % 50 == 0
+                    else Payment.Status.PAID
+                ),
+                tran_id=uuid.uuid4().hex,
+            )
+            for i, order in enumerate(orders)
+        ], batch_size=1000)
+        # Leave only the newest orders inside the changed-orders window, as
+        # after a refresh in production.
+        Order.objects.filter(
+            pk__gte=orders[0].pk,
+            pk__lt=orders[-100].pk,
+        ).update(updated_at=now - datetime.timedelta(days=30))
+
+    def sample_context(self):
+        now = timezone.now()
+        return {
+            'now': now,
+            'since': now - datetime.timedelta(minutes=10),
+            'session_key': Cart.objects.filter(
+                session_id__isnull=False
+            ).values_list('session_id', flat=True).last(),
+            'customer_id': Customer.objects.values_list(
+                'pk', flat=True
+            ).last(),
+            'token': ResetPassword.objects.values_list(
+                'token', flat=True
+            ).last(),
+            'category_id': Product.objects.values_list(
+                'category_id', flat=True
+            ).last(),
+        }
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for _, indexes, _ in HOT_QUERIES:
+                for _, name in indexes:
+                    cursor.execute(
+                        f'DROP INDEX {connection.ops.quote_name(name)}'
+                    )
+
+    def measure(self, ctx, repeat):
+        results = []
+        for label, _, build in HOT_QUERIES:
+            queryset = build(ctx)
+            plan = queryset.explain()
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / repeat
+            results.append((plan, elapsed))
+        return results
+
+    def report(self, before, after):
+        failures = 0
+        for position, (label, indexes, _) in enumerate(HOT_QUERIES):
+            names = ', '.join(name for _, name in indexes) or 'existing'
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{label} [{names}]'
+            ))
+            rows = [('with index', after[position])]
+            if before is not None and indexes:
+                rows.insert(0, ('without', before[position]))
+            for heading, (plan, elapsed) in rows:
+                self.stdout.write(f'  {heading}: {elapsed * 1000:.3f} ms')
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+            scans = full_scans(after[position][0])
+            if scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f"  full scan: {'; '.join(scans)}"
+                ))
+
+        if failures:
+            self.stdout.write(self.style.ERROR(
+                f'{failures} queries still scan a whole table.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Every hot query is served by an index.'
+            ))
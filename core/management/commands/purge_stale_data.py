@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.maintenance import TASKS, purge_stale_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete abandoned guest carts, expired sessions, used or expired '
+        'password reset tokens and old sent emails in small batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            help=f"Comma separated tasks to run ({', '.join(TASKS)}).",
+        )
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--pause',
+            type=float,
+            help='Seconds to sleep between batches.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be deleted.',
+        )
+
+    def handle(self, *args, **options):
+        tasks = None
+        if options['only']:
+            tasks = [name.strip() for name in options['only'].split(',')]
+            unknown = set(tasks) - set(TASKS)
+            if unknown:
+                raise CommandError(f"Unknown tasks: {', '.join(unknown)}")
+
+        results = purge_stale_data(
+            tasks=tasks,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}: {verb.lower()} {result['rows']} rows in "
+                f"{result['batches']} batches ({result['seconds']:.2f}s)"
+            )
+        total = sum(result['rows'] for result in results.values())
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} rows."))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import send_outbox_emails
+
+
+class Command(BaseCommand):
+    help = (
+        'Send queued outbox emails in batches over one mail server '
+        'connection, retrying failures with backoff.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Stop after this many batches (default: until drained).',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new mail.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds between polls with --loop.',
+        )
+        parser.add_argument(
+            '--file-backend',
+            metavar='DIR',
+            help='Write messages to files in DIR instead of sending them.',
+        )
+
+    def handle(self, *args, **options):
+        backend_options = {}
+        if options['file_backend']:
+            backend_options = {
+                'backend': 'django.core.mail.backends.filebased.EmailBackend',
+                'file_path': options['file_backend'],
+            }
+
+        while True:
+            totals = send_outbox_emails(
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                **backend_options,
+            )
+            if totals['sent'] or totals['failed'] or not options['loop']:
+                self.stdout.write(
+                    f"Sent {totals['sent']} emails, "
+                    f"{totals['failed']} failed."
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,108 @@
+"""Per-request SQL instrumentation.
+
+``QueryInstrumentationMiddleware`` wraps every database connection with
+``connection.execute_wrapper`` for the duration of a request and records
+how many statements ran, how long they took and how often each statement
+*shape* (its fingerprint, with literals and placeholders folded) repeated.
+A shape that runs more than ``QUERY_REPEAT_WARNING`` times in one request
+is almost always an N+1 and is logged as a warning. Statements on the
+tables of database caches, and on any listed in
+``QUERY_REPEAT_IGNORE_TABLES``, are counted but never reported as repeats:
+they are the cache backend's own reads, not the view's. With ``DEBUG`` on
+the numbers are also returned in ``X-Query-*`` response headers.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """``sql`` with literals, placeholders and IN lists normalized."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """An ``execute_wrapper`` that tallies the statements it sees."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated(self, threshold, ignore_tables=()):
+        """``(fingerprint, count)`` for shapes run more than ``threshold``
+        times, most frequent first, leaving out statements that mention
+        any of ``ignore_tables``."""
+        ignored = None
+        if ignore_tables:
+            ignored = re.compile(r'\b(?:{})\b'.format(
+                '|'.join(re.escape(table) for table in ignore_tables)
+            ))
+        return [
+            (sql, count) for sql, count in self.fingerprints.most_common()
+            if count > threshold
+            and (ignored is None or not ignored.search(sql))
+        ]
+
+
+def ignored_tables():
+    """Tables left out of N+1 detection."""
+    tables = list(settings.QUERY_REPEAT_IGNORE_TABLES)
+    for options in settings.CACHES.values():
+        if options['BACKEND'].endswith('.DatabaseCache'):
+            tables.append(options['LOCATION'])
+    return tables
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ignore_tables = ignored_tables()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        repeated = recorder.repeated(
+            settings.QUERY_REPEAT_WARNING, self.ignore_tables
+        )
+        for sql, count in repeated:
+            logger.warning(
+                'Possible N+1 on %s %s: %d x %s',
+                request.method, request.path, count, sql,
+            )
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time'] = f'{recorder.duration * 1000:.1f}ms'
+            response['X-Query-Repeated'] = str(len(repeated))
+        return response
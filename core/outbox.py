@@ -0,0 +1,159 @@
+"""Transactional email outbox.
+
+Views never talk to the mail server. ``enqueue_email`` only inserts an
+``OutboxEmail`` row, in the same transaction as the change the mail is
+about, so a rolled back request sends nothing and a committed one can't
+lose its mail. ``send_outbox_emails`` (run by the command of the same name)
+claims due rows in batches and delivers them over a single reused
+connection; failed sends are retried with exponential backoff until
+``OUTBOX_MAX_ATTEMPTS`` is reached.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import OutboxEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def new_email(subject, body, to, from_email=None):
+    """An unsaved ``OutboxEmail``, for ``bulk_create``."""
+    if isinstance(to, str):
+        to = [to]
+    return OutboxEmail(
+        subject=subject,
+        body=body,
+        from_email=from_email or '',
+        to=list(to),
+    )
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    email = new_email(subject, body, to, from_email)
+    email.save()
+    return email
+
+
+def retry_delay(attempts):
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** max(attempts - 1, 0)
+    return datetime.timedelta(
+        seconds=min(delay, settings.OUTBOX_MAX_RETRY_DELAY)
+    )
+
+
+def claim_batch(batch_size, now):
+    """Due emails, leased for ``OUTBOX_LEASE`` seconds.
+
+    The lease pushes ``next_attempt_at`` forward so another sender skips
+    these rows, and a sender that dies mid-batch only delays them.
+    """
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxEmail.Status.PENDING,
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        if emails:
+            OutboxEmail.objects.filter(
+                pk__in=[email.pk for email in emails],
+            ).update(
+                next_attempt_at=now + datetime.timedelta(
+                    seconds=settings.OUTBOX_LEASE
+                ),
+            )
+    return emails
+
+
+def to_message(email, connection):
+    return EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=email.to,
+        connection=connection,
+    )
+
+
+def record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboxEmail.Status.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+    OutboxEmail.objects.filter(pk=email.pk).update(
+        attempts=email.attempts,
+        last_error=email.last_error,
+        status=email.status,
+        next_attempt_at=email.next_attempt_at,
+    )
+
+
+def send_batch(emails, connection):
+    """Send ``emails`` over ``connection``; returns ``(sent, failed)``."""
+    sent = []
+    failed = 0
+    for index, email in enumerate(emails):
+        try:
+            # A no-op while the connection is up.
+            connection.open()
+        except Exception as e:
+            logger.warning('Could not connect to the mail server: %s', e)
+            now = timezone.now()
+            for unsent in emails[index:]:
+                record_failure(unsent, e, now)
+            failed += len(emails) - index
+            break
+        try:
+            connection.send_messages([to_message(email, connection)])
+        except Exception as e:
+            logger.warning('Could not send outbox email %s: %s', email.pk, e)
+            record_failure(email, e, timezone.now())
+            failed += 1
+            # The server may have dropped us; start the next message on a
+            # fresh connection rather than failing the rest of the batch.
+            connection.close()
+            continue
+        sent.append(email.pk)
+
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(
+            status=OutboxEmail.Status.SENT,
+            attempts=F('attempts') + 1,
+            last_error='',
+            sent_at=timezone.now(),
+        )
+    return len(sent), failed
+
+
+def send_outbox_emails(batch_size=None, max_batches=None, backend=None,
+                       **backend_options):
+    """Deliver due outbox mail; returns ``{'sent': n, 'failed': n}``.
+
+    ``backend`` and ``backend_options`` default to the project's
+    ``EMAIL_BACKEND`` settings.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    totals = {'sent': 0, 'failed': 0}
+    connection = get_connection(backend, **backend_options)
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            emails = claim_batch(batch_size, timezone.now())
+            if not emails:
+                break
+            batches += 1
+            sent, failed = send_batch(emails, connection)
+            totals['sent'] += sent
+            totals['failed'] += failed
+    finally:
+        connection.close()
+    return totals
@@ -0,0 +1,79 @@
+"""Paginators that avoid an exact ``COUNT(*)`` on large tables.
+
+Unfiltered listings take the row count from the database's own table
+statistics once a table is big enough for an estimate to be cheaper than
+counting; filtered ones are counted once and cached for a few minutes.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+COUNT_TIMEOUT = 60 * 5
+ESTIMATE_THRESHOLD = 100000
+
+
+def cached_count(queryset, timeout=COUNT_TIMEOUT):
+    """``COUNT(*)`` of ``queryset``, cached for a few minutes.
+
+    Counts are only shown as labels and page totals, so one that is a
+    little stale is fine and saves a full scan on every request.
+    """
+    sql = str(queryset.order_by().query)
+    key = f"queryset_count:{hashlib.sha1(sql.encode()).hexdigest()}"
+    return cache.get_or_set(key, queryset.count, timeout)
+
+
+def estimated_count(model, using='default'):
+    """Row count of ``model``'s table from planner statistics, if known."""
+    connection = connections[using]
+    table = model._meta.db_table
+    vendor = connection.vendor
+
+    if vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+        params = [connection.ops.quote_name(table)]
+    elif vendor == 'mysql':
+        sql = (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        )
+        params = [table]
+    elif vendor == 'sqlite':
+        # Only populated after ANALYZE; the first number is the row count.
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+        params = [table]
+    else:
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except Exception:
+        return None
+    if not row or row[0] is None:
+        return None
+    try:
+        count = int(str(row[0]).split()[0])
+    except ValueError:
+        return None
+    return count if count >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None:
+            return len(queryset)
+
+        if not query.where and not query.distinct:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return cached_count(queryset)
@@ -0,0 +1,40 @@
+"""Test helpers for keeping the storefront's query counts in check."""
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+
+from core.middleware import QueryRecorder
+
+
+class QueryBudgetMixin:
+    """Assertions for ``TestCase`` classes.
+
+    Budgets come from the ``QUERY_BUDGETS`` setting, keyed by URL name::
+
+        class StorefrontQueryTests(QueryBudgetMixin, TestCase):
+            def test_product_detail(self):
+                self.assertQueryBudget('product_detail', args=[product.pk])
+    """
+
+    def assertQueryBudget(self, url_name, args=None, kwargs=None,
+                          budget=None, client=None, method='get',
+                          data=None):
+        if budget is None:
+            budget = settings.QUERY_BUDGETS[url_name]
+        client = client or self.client
+        url = reverse(url_name, args=args, kwargs=kwargs)
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = getattr(client, method)(url, data)
+
+        if recorder.count > budget:
+            shapes = '\n'.join(
+                f'  {count} x {sql}'
+                for sql, count in recorder.fingerprints.most_common(5)
+            )
+            self.fail(
+                f'{url_name} ({url}) ran {recorder.count} queries, budget '
+                f'is {budget}. Most frequent:\n{shapes}'
+            )
+        return response
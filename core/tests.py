@@ -1,3 +1,77 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from core.events import JsonlSink
+from core.middleware import QueryRecorder, fingerprint, ignored_tables
+
+
+class QueryRecorderTests(SimpleTestCase):
+    def record(self, recorder, sql, times):
+        for _ in range(times):
+            recorder(lambda *args: None, sql, (), False, {})
+
+    def test_fingerprint_folds_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint(
+                "SELECT a FROM t WHERE id IN (%s, %s, %s) AND x = 'it''s' "
+                "LIMIT 21"
+            ),
+            'SELECT a FROM t WHERE id IN (...) AND x = ? LIMIT ?',
+        )
+
+    def test_repeated_leaves_out_ignored_tables(self):
+        recorder = QueryRecorder()
+        self.record(
+            recorder,
+            'SELECT * FROM "products_product" WHERE "id" = %s',
+            7,
+        )
+        self.record(
+            recorder,
+            'SELECT "cache_key" FROM "django_cache" WHERE "cache_key" IN (%s)',
+            7,
+        )
+
+        self.assertEqual(len(recorder.repeated(5)), 2)
+        repeated = recorder.repeated(5, ['django_cache'])
+        self.assertEqual(len(repeated), 1)
+        self.assertIn('products_product', repeated[0][0])
+        self.assertEqual(recorder.count, 14)
+
+    @override_settings(
+        QUERY_REPEAT_IGNORE_TABLES=['audit_log'],
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                'LOCATION': 'page_cache',
+            },
+            'local': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+        },
+    )
+    def test_ignored_tables_include_database_caches(self):
+        self.assertEqual(ignored_tables(), ['audit_log', 'page_cache'])
+
+
+class JsonlSinkTests(SimpleTestCase):
+    def test_appends_one_line_per_event(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'var', 'events.jsonl')
+            sink = JsonlSink(path)
+            sink.write([{'name': 'order.placed', 'data': {'id': 1}}])
+            sink.write([
+                {'name': 'order.paid', 'data': {'id': 1}},
+                {'name': 'order.placed', 'data': {'id': 2, 'note': 'x' * 8192}},
+            ])
+            with open(path) as handle:
+                events = [json.loads(line) for line in handle]
+
+        self.assertEqual(
+            [event['name'] for event in events],
+            ['order.placed', 'order.paid', 'order.placed'],
+        )
+        self.assertEqual(len(events[2]['data']['note']), 8192)
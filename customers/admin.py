@@ -3,4 +3,7 @@ from django.contrib import admin
 # Register your models here.
 from customers.models import Customer
 
-admin.site.register(Customer)
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    list_select_related = ['user']
@@ -0,0 +1,54 @@
+from django.utils.functional import SimpleLazyObject
+
+from customers.models import Customer
+
+
+def is_shopper(user):
+    """Signed-in users who shop; staff and superusers don't."""
+    return user.is_authenticated and not (user.is_staff or user.is_superuser)
+
+
+def get_customer(request):
+    """Customer profile of the signed-in shopper, or ``None``.
+
+    Resolved at most once per request (a single query) and shared by
+    views, context processors and services. Users without a profile yet,
+    e.g. ones created in the admin, get one on first use.
+    """
+    if not hasattr(request, '_cached_customer'):
+        customer = None
+        if is_shopper(request.user):
+            customer, _ = Customer.objects.get_or_create(user=request.user)
+        request._cached_customer = customer
+    return request._cached_customer
+
+
+def get_cart_key(request):
+    """Primary key of the shopper's cart, or ``None`` if there is none yet.
+
+    Always the cart ``get_request_cart`` returns (the customer's cart, or
+    the one whose id the session keeps), and looked up through it, so both
+    share one query per request.
+    """
+    from products.cart_service import get_request_cart
+
+    cart = get_request_cart(request)
+    return cart.pk if cart is not None else None
+
+
+class ShopperMiddleware:
+    """Expose lazily evaluated ``request.customer`` and ``request.cart_key``.
+
+    Nothing is queried unless they are used. A lazy object is never
+    ``None`` itself, so test them for truth (``if request.customer:``), or
+    call ``get_customer`` / ``get_cart_key`` when the real value is needed;
+    both read the same per-request cache.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.customer = SimpleLazyObject(lambda: get_customer(request))
+        request.cart_key = SimpleLazyObject(lambda: get_cart_key(request))
+        return self.get_response(request)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0006_address_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resetpassword',
+            index=models.Index(fields=['created_at'], name='resetpassword_created_idx'),
+        ),
+    ]
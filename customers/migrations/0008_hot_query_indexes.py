@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0007_resetpassword_created_idx'),
+        ('orders', '0003_stockreservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['customer', '-updated_at'], name='address_customer_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resetpassword',
+            index=models.Index(fields=['token'], name='resetpassword_token_idx'),
+        ),
+    ]
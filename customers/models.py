@@ -1,6 +1,7 @@
 import datetime
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
@@ -37,11 +38,24 @@ class ResetPassword(models.Model):
     def __str__(self):
         return self.token
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at'],
+                name='resetpassword_created_idx',
+            ),
+            # ResetPassword view: lookup by the token in the link.
+            models.Index(
+                fields=['token'],
+                name='resetpassword_token_idx',
+            ),
+        ]
+
     def is_valid(self):
         if self.is_used:
             return False
         exp_time = self.created_at + datetime.timedelta(hours=1)
-        if self.created_at < exp_time:
+        if timezone.now() < exp_time:
             return True
 
         return False
@@ -73,6 +87,15 @@ class Address(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # CheckoutView: the customer's most recently used address.
+            models.Index(
+                fields=['customer', '-updated_at'],
+                name='address_customer_recent_idx',
+            ),
+        ]
+
     def __str__(self):
         if self.customer:
             return f"{self.customer} - {self.address_line1}"
@@ -1,3 +1,49 @@
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from customers.middleware import ShopperMiddleware
+from customers.models import Customer
+from products.cart_service import SESSION_CART_KEY, get_request_cart
+from products.models import Cart
+
+
+class ShopperMiddlewareTests(TestCase):
+    def process(self, user, session=None):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = session or SessionStore()
+        return ShopperMiddleware(lambda request: request)(request)
+
+    def test_attributes_are_lazy(self):
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'pw')
+        with self.assertNumQueries(0):
+            self.process(user)
+
+    def test_customer_and_cart(self):
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'pw')
+        customer = Customer.objects.create(user=user)
+        cart = Cart.objects.create(customer=customer)
+
+        request = self.process(user)
+        self.assertEqual(request.customer.pk, customer.pk)
+        self.assertEqual(request.cart_key, cart.pk)
+        # Shares the per-request lookup with get_request_cart.
+        with self.assertNumQueries(0):
+            self.assertEqual(get_request_cart(request).pk, cart.pk)
+
+    def test_guest_cart_key_follows_the_session_cart_id(self):
+        session = SessionStore()
+        session.create()
+        Cart.objects.create(session_id=session.session_key)
+        cart = Cart.objects.create(session_id=session.session_key)
+        session[SESSION_CART_KEY] = cart.pk
+
+        request = self.process(AnonymousUser(), session)
+        self.assertFalse(request.customer)
+        self.assertEqual(request.cart_key, cart.pk)
+
+    def test_visitor_without_cart(self):
+        request = self.process(AnonymousUser())
+        self.assertFalse(request.customer)
+        self.assertFalse(request.cart_key)
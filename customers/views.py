@@ -7,7 +7,9 @@ from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 from .models import Customer, ResetPassword as ResetPassModel
-from django.core.mail import send_mail
+from django.db import transaction
+
+from core.outbox import enqueue_email
 
 
 class RegisterView(View):
@@ -99,15 +101,14 @@ class SendResetEamil(View):
             messages.error(request, 'Email not found!!!')
             return render(request, 'ecommerce/send_reset.html')
 
-        token_obj = ResetPassModel.objects.create(user=users.first())
-
-        send_mail(
-            'Reset Password',
-            f'Here is your password reset url: http://localhost:8000/customers/reset-password/{token_obj.token}/',
-            'r.rahul.devops007@gmail.com',
-            [email],
-            fail_silently=False,
-        )
+        # Queued with the token and sent by `manage.py send_outbox_emails`.
+        with transaction.atomic():
+            token_obj = ResetPassModel.objects.create(user=users.first())
+            enqueue_email(
+                'Reset Password',
+                f'Here is your password reset url: http://localhost:8000/customers/reset-password/{token_obj.token}/',
+                [email],
+            )
 
         return redirect('send_reset')
 
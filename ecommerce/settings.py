@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'products',
     'orders',
     'customers',
+    'analytics',
 
     # Allauth apps
     'allauth',
@@ -52,11 +53,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'customers.middleware.ShopperMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -202,3 +205,90 @@ SSLCOMMERZ_SUCCESS_URL = 'http://localhost:8000/orders/sslcommerz/success/'
 SSLCOMMERZ_FAIL_URL = 'http://localhost:8000/orders/sslcommerz/fail/'
 SSLCOMMERZ_CANCEL_URL = 'http://localhost:8000/orders/sslcommerz/cancel/'
 SSLCOMMERZ_IPN_URL = 'http://localhost:8000/orders/sslcommerz/ipn/'
+
+# Gateway HTTP client (see orders/sslcommerz_service.py). Point
+# SSLCOMMERZ_API_URL at `manage.py sslcommerz_stub` to work offline.
+SSLCOMMERZ_API_URL = None
+SSLCOMMERZ_CONNECT_TIMEOUT = 3.05
+SSLCOMMERZ_READ_TIMEOUT = 10
+SSLCOMMERZ_POOL_SIZE = 20
+
+
+# Responsive image derivatives (see products/image_derivatives.py)
+IMAGE_DERIVATIVE_DIR = 'derivatives'
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1024]
+IMAGE_DERIVATIVE_FORMAT = 'WEBP'
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2
+
+
+# Product search index (see products/search.py)
+SEARCH_INDEX_PATH = BASE_DIR / 'var' / 'search_index.pickle'
+SEARCH_INDEX_SAVE_DELAY = 2
+
+# Price ranges offered as listing facets (see products/facets.py)
+PRODUCT_PRICE_BUCKETS = [0, 50, 100, 200, 500]
+
+# How long stock stays held for an unpaid SSLCommerz order, in seconds
+# (see orders/inventory.py)
+STOCK_RESERVATION_TTL = 60 * 30
+
+# Retention for core/maintenance.py (`manage.py purge_stale_data`)
+GUEST_CART_RETENTION_DAYS = 30
+RESET_TOKEN_RETENTION_HOURS = 24
+PURGE_BATCH_SIZE = 500
+PURGE_BATCH_PAUSE = 0.2
+
+# Cache shared by every worker process. Version counters
+# (core/cache_versions.py) invalidate the category tree, search and facet
+# indexes, product fragments and variant matrices across workers, and the
+# payment callbacks use it to coordinate; a per-process cache such as
+# LocMemCache silently breaks both once more than one process serves the
+# site. The database cache needs `python manage.py createcachetable`. For
+# high traffic swap in Redis or Memcached, e.g.
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#   'LOCATION': 'redis://127.0.0.1:6379',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
+# Domain event bus (see core/events.py). SINK is 'db', 'jsonl' or None.
+# The table is safe for any number of worker processes; 'jsonl' appends to
+# PATH and suits a single process or local development.
+DOMAIN_EVENTS = {
+    'SINK': 'db',
+    'PATH': BASE_DIR / 'var' / 'events.jsonl',
+    'BUFFER_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+}
+
+# Email outbox (see core/outbox.py and `manage.py send_outbox_emails`).
+# Failed sends are retried after OUTBOX_RETRY_DELAY seconds, doubling up
+# to OUTBOX_MAX_RETRY_DELAY, and given up after OUTBOX_MAX_ATTEMPTS.
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_RETRY_DELAY = 60 * 60 * 6
+OUTBOX_LEASE = 60 * 5
+OUTBOX_RETENTION_DAYS = 14
+
+# SQL instrumentation (see core/middleware.py): warn when one statement
+# shape runs more than QUERY_REPEAT_WARNING times in a request. Database
+# cache tables are always left out; list any other tables to ignore here.
+QUERY_REPEAT_WARNING = 5
+QUERY_REPEAT_IGNORE_TABLES = []
+
+# Query budgets per URL name for a signed-in shopper with a cart, checked
+# by core.testing.QueryBudgetMixin (see products/tests.py, orders/tests.py).
+# They include the shared cache's reads, which are queries with the
+# database cache backend.
+QUERY_BUDGETS = {
+    'product_list': 11,
+    'product_detail': 9,
+    'cart': 8,
+    'checkout': 8,
+}
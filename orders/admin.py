@@ -2,17 +2,32 @@ from django.contrib import admin
 
 # Register your models here.
 
-from orders.models import Order, OrderItem, Payment
+from core.paginator import EstimatedCountPaginator
+from orders.models import Order, OrderItem, Payment, StockReservation
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """List pages that stay fast on tables with millions of rows.
+
+    Counts come from table statistics or a short-lived cache instead of a
+    ``COUNT(*)`` per request, and the unfiltered total isn't recounted
+    next to filtered results.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    search_fields = ['variant__sku', 'variant__product__name']
+    raw_id_fields = ['variant']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('variant')
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdmin):
     list_display = [
         'id',
         'customer',
@@ -23,12 +38,14 @@ class OrderAdmin(admin.ModelAdmin):
         'created_at',
     ]
     list_filter = ['status', 'created_at', 'updated_at']
+    list_select_related = ['customer__user']
+    raw_id_fields = ['customer']
     readonly_fields = ['created_at', 'updated_at']
     inlines = [OrderItemInline]
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(LargeTableAdmin):
     list_display = [
         'id',
         'order',
@@ -38,11 +55,13 @@ class OrderItemAdmin(admin.ModelAdmin):
         'created_at',
     ]
     list_filter = ['created_at', 'updated_at']
+    list_select_related = ['order', 'variant']
+    raw_id_fields = ['order', 'variant']
     readonly_fields = ['created_at', 'updated_at']
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdmin):
     list_display = [
         'id',
         'order',
@@ -54,4 +73,22 @@ class PaymentAdmin(admin.ModelAdmin):
     ]
     list_filter = ['payment_type', 'status', 'created_at', 'updated_at']
     search_fields = ['order__id', 'transaction_id']
+    raw_id_fields = ['order']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(LargeTableAdmin):
+    list_display = [
+        'id',
+        'order',
+        'variant',
+        'quantity',
+        'status',
+        'expires_at',
+        'created_at',
+    ]
+    list_filter = ['status', 'created_at']
+    list_select_related = ['order', 'variant']
+    raw_id_fields = ['order', 'variant']
     readonly_fields = ['created_at', 'updated_at']
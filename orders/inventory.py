@@ -0,0 +1,207 @@
+"""Stock reservations for checkout.
+
+Stock is taken with one conditional ``UPDATE ... SET stock = stock - n
+WHERE stock >= n`` per variant, so an order can never drive stock below
+zero and no row is read-locked up front. Lines are always reserved in
+variant id order, which keeps concurrent checkouts of overlapping carts
+from deadlocking, and callers do this last in their transaction so the
+hot rows stay locked for as short a time as possible.
+
+Stock changes go through ``UPDATE`` statements, which send no model
+signals, so every change bumps the affected products' cache versions
+itself once the transaction commits; otherwise the product page and the
+variant matrix would keep showing the old availability.
+
+Cash on delivery orders commit their stock straight away. Online payments
+hold it for ``STOCK_RESERVATION_TTL`` seconds; the hold is committed when
+the payment is confirmed and handed back when it fails, is canceled or
+expires (see ``orders.payment_service.expire_unpaid_orders``).
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from orders.models import StockReservation
+from products.models import ProductVariant
+from products.page_cache import invalidate_product
+
+
+class InsufficientStock(Exception):
+    def __init__(self, variant_id):
+        super().__init__(f"Not enough stock for variant #{variant_id}")
+        self.variant_id = variant_id
+
+
+def _stock_changed(variant_ids):
+    """Invalidate the cached pages of the variants' products on commit."""
+    product_ids = set(
+        ProductVariant.objects.filter(
+            pk__in=variant_ids,
+        ).values_list('product_id', flat=True)
+    )
+
+    def invalidate():
+        for product_id in product_ids:
+            invalidate_product(product_id)
+
+    transaction.on_commit(invalidate)
+
+
+def _take(quantities, now):
+    for variant_id in sorted(quantities):
+        quantity = quantities[variant_id]
+        updated = ProductVariant.objects.filter(
+            pk=variant_id,
+            stock__gte=quantity,
+        ).update(stock=F('stock') - quantity, updated_at=now)
+        if not updated:
+            raise InsufficientStock(variant_id)
+    _stock_changed(quantities)
+
+
+def reserve_stock(order, lines, hold=False):
+    """Take stock for ``lines`` (``(variant_id, quantity)`` pairs).
+
+    Must run inside the transaction that creates ``order``; raises
+    ``InsufficientStock`` on the first line that can't be covered, which
+    rolls the whole order back. With ``hold`` the reservation expires
+    after ``STOCK_RESERVATION_TTL`` unless it is committed first.
+    """
+    quantities = defaultdict(int)
+    for variant_id, quantity in lines:
+        quantities[variant_id] += quantity
+
+    now = timezone.now()
+    _take(quantities, now)
+
+    if hold:
+        status = StockReservation.Status.HELD
+        expires_at = now + datetime.timedelta(
+            seconds=settings.STOCK_RESERVATION_TTL
+        )
+    else:
+        status = StockReservation.Status.COMMITTED
+        expires_at = None
+
+    return StockReservation.objects.bulk_create([
+        StockReservation(
+            order=order,
+            variant_id=variant_id,
+            quantity=quantity,
+            status=status,
+            expires_at=expires_at,
+        )
+        for variant_id, quantity in sorted(quantities.items())
+    ])
+
+
+def commit_orders_stock(order_ids):
+    """Make the held stock of paid orders permanent."""
+    return StockReservation.objects.filter(
+        order_id__in=order_ids,
+        status=StockReservation.Status.HELD,
+    ).update(
+        status=StockReservation.Status.COMMITTED,
+        expires_at=None,
+        updated_at=timezone.now(),
+    )
+
+
+def secure_orders_stock(order_ids):
+    """Commit the stock of paid ``order_ids``.
+
+    An order whose hold was already handed back (it expired before the
+    payment came through) has its lines taken again if the stock is still
+    there. Returns the ids of the orders left without their stock; those
+    must not be confirmed.
+    """
+    commit_orders_stock(order_ids)
+
+    lines = defaultdict(lambda: defaultdict(int))
+    covered = set()
+    rows = StockReservation.objects.filter(
+        order_id__in=order_ids,
+    ).exclude(
+        status=StockReservation.Status.HELD,
+    ).values_list('order_id', 'status', 'variant_id', 'quantity')
+    for order_id, status, variant_id, quantity in rows:
+        if status == StockReservation.Status.COMMITTED:
+            covered.add(order_id)
+        else:
+            lines[order_id][variant_id] += quantity
+
+    short = set()
+    now = timezone.now()
+    for order_id, quantities in lines.items():
+        if order_id in covered:
+            continue
+        try:
+            with transaction.atomic():
+                _take(quantities, now)
+                StockReservation.objects.bulk_create([
+                    StockReservation(
+                        order_id=order_id,
+                        variant_id=variant_id,
+                        quantity=quantity,
+                        status=StockReservation.Status.COMMITTED,
+                    )
+                    for variant_id, quantity in sorted(quantities.items())
+                ])
+        except InsufficientStock:
+            short.add(order_id)
+    return short
+
+
+def _release(reservations):
+    """Return the stock of held ``reservations`` to their variants.
+
+    Each reservation is claimed with a conditional update first, so a
+    callback that fires twice, or races the expiry job, can only give the
+    stock back once. Returns the number of reservations released.
+    """
+    now = timezone.now()
+    released = 0
+    variant_ids = set()
+    with transaction.atomic():
+        rows = reservations.filter(
+            status=StockReservation.Status.HELD,
+        ).order_by('variant_id', 'pk').values_list(
+            'pk', 'variant_id', 'quantity'
+        )
+        for pk, variant_id, quantity in list(rows):
+            claimed = StockReservation.objects.filter(
+                pk=pk,
+                status=StockReservation.Status.HELD,
+            ).update(status=StockReservation.Status.RELEASED, updated_at=now)
+            if not claimed:
+                continue
+            ProductVariant.objects.filter(pk=variant_id).update(
+                stock=F('stock') + quantity,
+                updated_at=now,
+            )
+            variant_ids.add(variant_id)
+            released += 1
+        if variant_ids:
+            _stock_changed(variant_ids)
+    return released
+
+
+def release_stock(order_id):
+    return release_orders_stock([order_id])
+
+
+def release_orders_stock(order_ids):
+    return _release(StockReservation.objects.filter(order_id__in=order_ids))
+
+
+def expired_order_ids(now, limit):
+    """Orders with a hold past its TTL, oldest expiry first."""
+    order_ids = StockReservation.objects.filter(
+        status=StockReservation.Status.HELD,
+        expires_at__lte=now,
+    ).order_by('expires_at', 'pk').values_list('order_id', flat=True)
+    return list(dict.fromkeys(order_ids[:limit]))
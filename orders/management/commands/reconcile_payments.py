@@ -0,0 +1,170 @@
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.models import Payment
+from orders.payment_service import gateway_outcome, settle_payments
+from orders.sslcommerz_service import SSLCommerzError, SSLCommerzService
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Command(BaseCommand):
+    help = (
+        'Check SSLCommerz payments that stayed pending without a callback '
+        'against the gateway and confirm, fail or cancel them. Progress is '
+        'checkpointed after every batch, so an interrupted run resumes '
+        'where it stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=30,
+            help='Only check payments pending for this many minutes.',
+        )
+        parser.add_argument(
+            '--abandon-after',
+            type=int,
+            default=60 * 24,
+            help=(
+                'Fail payments the gateway has no record of once they are '
+                'this many minutes old.'
+            ),
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=20,
+            help='Maximum gateway requests per second (0 for no limit).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=settings.BASE_DIR / 'var' / 'reconcile_payments.checkpoint',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint left by an interrupted run.',
+        )
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as handle:
+                return int(handle.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def write_checkpoint(self, path, last_pk):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.tmp"
+        with open(temp, 'w') as handle:
+            handle.write(str(last_pk))
+        os.replace(temp, path)
+
+    def lookup(self, service, limiter, tran_id):
+        limiter.wait()
+        try:
+            return service.query_transaction(tran_id)
+        except SSLCommerzError:
+            return None
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - datetime.timedelta(minutes=options['older_than'])
+        abandon_before = now - datetime.timedelta(
+            minutes=options['abandon_after']
+        )
+        checkpoint = str(options['checkpoint'])
+        last_pk = 0 if options['restart'] else self.read_checkpoint(checkpoint)
+        if last_pk:
+            self.stdout.write(f'Resuming after payment #{last_pk}.')
+
+        service = SSLCommerzService()
+        limiter = RateLimiter(options['rate'])
+        pending = Payment.objects.filter(
+            status=Payment.Status.PENDING,
+            payment_type=Payment.PaymentType.SSLCOMMERZ,
+            tran_id__isnull=False,
+            created_at__lt=cutoff,
+        ).only('pk', 'order_id', 'tran_id', 'amount', 'status', 'created_at')
+
+        started = time.monotonic()
+        checked = errors = 0
+        totals = {status: 0 for status in Payment.Status.values}
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(
+                    pending.filter(pk__gt=last_pk)
+                    .order_by('pk')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+
+                responses = pool.map(
+                    lambda payment: self.lookup(
+                        service, limiter, payment.tran_id
+                    ),
+                    batch,
+                )
+                outcomes = []
+                for payment, response in zip(batch, responses):
+                    if response is None:
+                        errors += 1
+                        continue
+                    outcome = gateway_outcome(
+                        response,
+                        payment,
+                        abandoned=payment.created_at < abandon_before,
+                    )
+                    if outcome is not None:
+                        outcomes.append((payment, *outcome))
+
+                for status, count in settle_payments(outcomes).items():
+                    totals[status] += count
+                checked += len(batch)
+                last_pk = batch[-1].pk
+                self.write_checkpoint(checkpoint, last_pk)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{checked} checked, {totals['paid']} paid, "
+                    f"{totals['failed']} failed, "
+                    f"{totals['canceled']} canceled, {errors} errors "
+                    f"({checked / elapsed:.1f} payments/s)"
+                )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {checked} payments in {elapsed:.1f}s: "
+            f"{totals['paid']} paid, {totals['failed']} failed, "
+            f"{totals['canceled']} canceled, {errors} gateway errors."
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from orders.payment_service import expire_unpaid_orders
+
+
+class Command(BaseCommand):
+    help = (
+        'Return the stock held by unpaid orders whose reservation expired, '
+        'failing their payment and canceling the order.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        closed = expire_unpaid_orders(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Closed {closed} expired unpaid orders.')
+        )
@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from core.benchmark import percentile
+from orders.sslcommerz_service import SSLCommerzError, SSLCommerzService
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency and throughput of gateway session requests. Meant '
+        'to be pointed at `manage.py sslcommerz_stub` via SSLCOMMERZ_API_URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument(
+            '--no-pool',
+            action='store_true',
+            help='Open a new connection for every request, for comparison.',
+        )
+
+    def call(self, pooled):
+        service = SSLCommerzService(
+            http=None if pooled else requests.Session()
+        )
+        started = time.perf_counter()
+        try:
+            service.create_session({
+                'total_amount': 100,
+                'currency': 'BDT',
+                'tran_id': service.generate_tran_id(),
+            })
+            ok = True
+        except SSLCommerzError:
+            ok = False
+        finally:
+            if not pooled:
+                service.http.close()
+        return time.perf_counter() - started, ok
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        pooled = not options['no_pool']
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(
+                lambda _: self.call(pooled), range(total)
+            ))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency * 1000 for latency, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        self.stdout.write(
+            f"{total} requests ({'pooled' if pooled else 'unpooled'}, "
+            f"concurrency {options['concurrency']}) in {elapsed:.2f}s: "
+            f"{total / elapsed:.1f} req/s, "
+            f"p50 {percentile(latencies, 0.5):.1f}ms, "
+            f"p95 {percentile(latencies, 0.95):.1f}ms, "
+            f"p99 {percentile(latencies, 0.99):.1f}ms, "
+            f"{errors} errors"
+        )
@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management.base import BaseCommand
+from django.utils.html import escape
+
+from orders.sslcommerz_service import (
+    SESSION_PATH,
+    TRANSACTION_PATH,
+    VALIDATION_PATH,
+)
+
+
+class StubGateway:
+    """Enough of the SSLCommerz API to check out and benchmark offline.
+
+    Sessions always succeed; the "gateway page" is a button that posts the
+    transaction back to the store's success URL with ``val_id`` set to
+    ``VAL-<tran_id>``, which the validation endpoint then accepts.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def create_session(self, fields, base_url):
+        tran_id = fields.get('tran_id', '')
+        with self.lock:
+            self.sessions[tran_id] = fields
+        return {
+            'status': 'SUCCESS',
+            'sessionkey': uuid.uuid4().hex,
+            'GatewayPageURL': f"{base_url}/gateway/{tran_id}",
+        }
+
+    def validate(self, val_id):
+        tran_id = val_id.removeprefix('VAL-')
+        with self.lock:
+            fields = self.sessions.get(tran_id)
+        if fields is None:
+            return {'status': 'INVALID_TRANSACTION'}
+        return {
+            'status': 'VALID',
+            'val_id': val_id,
+            'tran_id': tran_id,
+            'amount': fields.get('total_amount', '0'),
+        }
+
+    def query(self, tran_id):
+        response = self.validate(f"VAL-{tran_id}")
+        if response['status'] != 'VALID':
+            return {'APIConnect': 'DONE', 'no_of_trans_found': 0}
+        return {
+            'APIConnect': 'DONE',
+            'no_of_trans_found': 1,
+            'element': [response],
+        }
+
+    def gateway_page(self, tran_id):
+        with self.lock:
+            fields = self.sessions.get(tran_id)
+        if fields is None:
+            return None
+        return (
+            '<!doctype html><title>Stub gateway</title>'
+            f'<p>Pay {escape(fields.get("total_amount"))} BDT</p>'
+            f'<form method="post" action="{escape(fields.get("success_url"))}">'
+            f'<input type="hidden" name="tran_id" value="{escape(tran_id)}">'
+            f'<input type="hidden" name="val_id" value="VAL-{escape(tran_id)}">'
+            '<button>Pay</button></form>'
+            f'<form method="post" action="{escape(fields.get("fail_url"))}">'
+            f'<input type="hidden" name="tran_id" value="{escape(tran_id)}">'
+            '<button>Fail</button></form>'
+        )
+
+
+def make_handler(gateway):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def send_body(self, status, body, content_type):
+            body = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, payload):
+            self.send_body(200, json.dumps(payload), 'application/json')
+
+        def do_POST(self):
+            time.sleep(gateway.latency)
+            length = int(self.headers.get('Content-Length') or 0)
+            fields = {
+                key: values[0]
+                for key, values in parse_qs(
+                    self.rfile.read(length).decode()
+                ).items()
+            }
+            if urlsplit(self.path).path != SESSION_PATH:
+                return self.send_body(404, 'Not found', 'text/plain')
+            base_url = f"http://{self.headers.get('Host')}"
+            self.send_json(gateway.create_session(fields, base_url))
+
+        def do_GET(self):
+            time.sleep(gateway.latency)
+            url = urlsplit(self.path)
+            if url.path == VALIDATION_PATH:
+                val_id = parse_qs(url.query).get('val_id', [''])[0]
+                return self.send_json(gateway.validate(val_id))
+            if url.path == TRANSACTION_PATH:
+                tran_id = parse_qs(url.query).get('tran_id', [''])[0]
+                return self.send_json(gateway.query(tran_id))
+            if url.path.startswith('/gateway/'):
+                page = gateway.gateway_page(url.path[len('/gateway/'):])
+                if page is not None:
+                    return self.send_body(200, page, 'text/html')
+            self.send_body(404, 'Not found', 'text/plain')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local stand-in for the SSLCommerz API. Set '
+        'SSLCOMMERZ_API_URL to its address to check out without the '
+        'real gateway or to benchmark the client.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0,
+            help='Artificial delay added to every response, in milliseconds.',
+        )
+
+    def handle(self, *args, **options):
+        gateway = StubGateway(options['latency'] / 1000)
+        server = ThreadingHTTPServer(
+            (options['host'], options['port']),
+            make_handler(gateway),
+        )
+        self.stdout.write(
+            f"Stub gateway listening on "
+            f"http://{options['host']}:{options['port']}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -47,6 +47,12 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Changed orders since the last sales rollup refresh.
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.pk}"
 
@@ -121,5 +127,53 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # reconcile_payments walks pending payments in pk order.
+            models.Index(
+                fields=['id'],
+                condition=models.Q(status='pending'),
+                name='payment_pending_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Payment #{self.pk} (Order #{self.order_id})"
+
+
+class StockReservation(models.Model):
+    class Status(models.TextChoices):
+        HELD = 'held', 'Held'
+        COMMITTED = 'committed', 'Committed'
+        RELEASED = 'released', 'Released'
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='reservations'
+    )
+    variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.CASCADE,
+        related_name='reservations'
+    )
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.HELD
+    )
+    expires_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'expires_at'],
+                name='reservation_expiry_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Reservation #{self.pk} (Order #{self.order_id})"
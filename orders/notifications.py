@@ -0,0 +1,28 @@
+"""Customer mail about orders, queued through the ``core.outbox``."""
+from core.outbox import new_email
+from core.models import OutboxEmail
+from orders.models import Order
+
+
+def order_confirmation_email(order_id, total, email):
+    return new_email(
+        f'Order #{order_id} confirmation',
+        f'Thank you for your order #{order_id}.\n\n'
+        f'Total: {total}\n\n'
+        'We will let you know when it ships.',
+        [email],
+    )
+
+
+def queue_order_confirmations(order_ids):
+    """Queue confirmation mail for ``order_ids`` with one query.
+
+    Guest orders have no address to write to and are skipped.
+    """
+    rows = Order.objects.filter(
+        pk__in=order_ids,
+        customer__user__email__gt='',
+    ).values_list('pk', 'total', 'customer__user__email')
+    OutboxEmail.objects.bulk_create([
+        order_confirmation_email(*row) for row in rows
+    ])
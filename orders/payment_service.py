@@ -0,0 +1,333 @@
+"""Shared handling of the SSLCommerz success redirect and IPN.
+
+Both callbacks usually arrive for the same transaction within moments of
+each other. The gateway's validation answer is cached per ``val_id`` (with
+a short lock so concurrent callbacks wait for the first lookup instead of
+repeating it), and the payment only moves out of ``pending`` through a
+conditional UPDATE, so exactly one callback applies the outcome.
+"""
+import logging
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.events import emit
+from orders.inventory import (
+    expired_order_ids,
+    release_orders_stock,
+    release_stock,
+    secure_orders_stock,
+)
+from orders.models import Order, Payment
+from orders.notifications import queue_order_confirmations
+from orders.sslcommerz_service import SSLCommerzError, SSLCommerzService
+
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_TIMEOUT = 60 * 60
+VALIDATION_LOCK_TIMEOUT = 30
+VALIDATION_POLL_INTERVAL = 0.1
+
+
+def validation_key(val_id):
+    return f"sslcommerz_validation:{val_id}"
+
+
+def get_validation(val_id, service=None):
+    """Gateway validation response for ``val_id``, fetched at most once."""
+    key = validation_key(val_id)
+    response = cache.get(key)
+    if response is not None:
+        return response
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + VALIDATION_LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, VALIDATION_LOCK_TIMEOUT):
+        time.sleep(VALIDATION_POLL_INTERVAL)
+        response = cache.get(key)
+        if response is not None:
+            return response
+        if time.monotonic() > deadline:
+            break
+
+    try:
+        response = (service or SSLCommerzService()).validate_transaction(
+            val_id
+        )
+        if not isinstance(response, dict):
+            raise SSLCommerzError('Unexpected validation response')
+        cache.set(key, response, VALIDATION_TIMEOUT)
+        return response
+    finally:
+        cache.delete(lock_key)
+
+
+def is_valid_payment(response, payment):
+    try:
+        amount = Decimal(str(response.get('amount', 0)))
+    except InvalidOperation:
+        return False
+    return (
+        response.get('status') in ('VALID', 'VALIDATED')
+        and amount == payment.amount
+        and response.get('tran_id') == payment.tran_id
+    )
+
+
+def emit_order_confirmed(payment):
+    emit(
+        'order.confirmed',
+        order_id=payment.order_id,
+        payment_id=payment.pk,
+        tran_id=payment.tran_id,
+        amount=payment.amount,
+    )
+
+
+def emit_payment_closed(payment, order_canceled=False):
+    # ``payment.failed`` or ``payment.canceled``.
+    emit(
+        f"payment.{payment.status}",
+        order_id=payment.order_id,
+        payment_id=payment.pk,
+        tran_id=payment.tran_id,
+        order_canceled=order_canceled,
+    )
+
+
+def confirm_orders(payments, now):
+    """Confirm the orders of freshly paid ``payments``.
+
+    Must run in the transaction that marked them paid. An order whose
+    stock is gone (its hold expired and the units were sold since) is
+    canceled instead, so the stock is never sold twice; its payment needs
+    a refund. Returns the ids of those orders.
+    """
+    order_ids = [payment.order_id for payment in payments]
+    short = secure_orders_stock(order_ids)
+    confirmed = [pk for pk in order_ids if pk not in short]
+
+    Order.objects.filter(pk__in=confirmed).update(
+        status=Order.Status.CONFIRMED,
+        updated_at=now,
+    )
+    queue_order_confirmations(confirmed)
+    for payment in payments:
+        if payment.order_id in short:
+            logger.error(
+                'Payment %s was made after the stock of order %s was '
+                'released and sold; the order is canceled and needs a '
+                'refund.', payment.pk, payment.order_id,
+            )
+        else:
+            emit_order_confirmed(payment)
+
+    if short:
+        Order.objects.filter(pk__in=short).update(
+            status=Order.Status.CANCELED,
+            updated_at=now,
+        )
+    return short
+
+
+def finalize_payment(payment, val_id, details, service=None):
+    """Apply the gateway's verdict on ``payment`` exactly once.
+
+    ``details`` holds the ``bank_tran_id``, ``card_type`` and
+    ``card_brand`` posted by the gateway. Returns ``True`` when this call
+    moved the payment out of ``pending``; ``payment.status`` reflects the
+    outcome either way. Raises ``SSLCommerzError`` when the gateway can't
+    be reached, leaving the payment pending.
+    """
+    if payment.status != Payment.Status.PENDING:
+        return False
+
+    response = get_validation(val_id, service)
+    now = timezone.now()
+
+    if not is_valid_payment(response, payment):
+        # Same path as a fail callback: cancel the order, hand back stock.
+        if abort_payment(payment, Payment.Status.FAILED, cancel_order=True):
+            return True
+        payment.refresh_from_db(fields=['status'])
+        return False
+
+    bank_tran_id = details.get('bank_tran_id')
+    fields = {
+        'status': Payment.Status.PAID,
+        'val_id': val_id,
+        'bank_tran_id': bank_tran_id,
+        'card_type': details.get('card_type'),
+        'card_brand': details.get('card_brand'),
+        'transaction_id': bank_tran_id,
+    }
+    with transaction.atomic():
+        updated = Payment.objects.filter(
+            pk=payment.pk,
+            status=Payment.Status.PENDING,
+        ).update(updated_at=now, **fields)
+        if updated:
+            short = confirm_orders([payment], now)
+
+    if updated:
+        for name, value in fields.items():
+            setattr(payment, name, value)
+        payment.order.status = (
+            Order.Status.CANCELED if short else Order.Status.CONFIRMED
+        )
+    else:
+        payment.refresh_from_db(fields=['status'])
+    return bool(updated)
+
+
+def abort_payment(payment, status, cancel_order=False):
+    """Move a pending payment to ``status`` and hand back its stock.
+
+    Like ``finalize_payment`` this only acts on a pending payment, so a
+    late fail or cancel callback can't undo a confirmed one.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Payment.objects.filter(
+            pk=payment.pk,
+            status=Payment.Status.PENDING,
+        ).update(status=status, updated_at=now)
+        if not updated:
+            return False
+        if cancel_order:
+            Order.objects.filter(pk=payment.order_id).update(
+                status=Order.Status.CANCELED,
+                updated_at=now,
+            )
+        release_stock(payment.order_id)
+        payment.status = status
+        emit_payment_closed(payment, order_canceled=cancel_order)
+    return True
+
+
+GATEWAY_FAILED = ('FAILED', 'EXPIRED')
+GATEWAY_CANCELED = ('CANCELLED', 'UNATTEMPTED')
+
+
+def gateway_outcome(response, payment, abandoned=False):
+    """``(status, fields)`` for a transaction query, or ``None``.
+
+    ``response`` is the gateway's answer to ``query_transaction``. A
+    payment the gateway has no record of is only failed when
+    ``abandoned``, i.e. old enough that its session can't be used any more.
+    """
+    elements = response.get('element') or []
+    for element in elements:
+        if is_valid_payment(element, payment):
+            return Payment.Status.PAID, {
+                'val_id': element.get('val_id'),
+                'bank_tran_id': element.get('bank_tran_id'),
+                'card_type': element.get('card_type'),
+                'card_brand': element.get('card_brand'),
+                'transaction_id': element.get('bank_tran_id'),
+            }
+
+    statuses = {element.get('status') for element in elements}
+    if statuses & set(GATEWAY_FAILED):
+        return Payment.Status.FAILED, {}
+    if statuses & set(GATEWAY_CANCELED):
+        return Payment.Status.CANCELED, {}
+    if not elements and abandoned:
+        return Payment.Status.FAILED, {}
+    return None
+
+
+def settle_payments(outcomes):
+    """Apply ``(payment, status, fields)`` outcomes in bulk.
+
+    Payments that left ``pending`` in the meantime (a late callback) are
+    skipped. Paid orders are confirmed and their stock committed; failed
+    and canceled ones are canceled and their stock released. Returns the
+    number of payments moved to each status.
+    """
+    counts = {status: 0 for status in Payment.Status.values}
+    if not outcomes:
+        return counts
+
+    now = timezone.now()
+    with transaction.atomic():
+        pending = set(
+            Payment.objects.select_for_update().filter(
+                pk__in=[payment.pk for payment, _, _ in outcomes],
+                status=Payment.Status.PENDING,
+            ).values_list('pk', flat=True)
+        )
+
+        paid = []
+        closed = {}
+        for payment, status, fields in outcomes:
+            if payment.pk not in pending:
+                continue
+            counts[status] += 1
+            if status == Payment.Status.PAID:
+                payment.status = status
+                payment.updated_at = now
+                for name, value in fields.items():
+                    setattr(payment, name, value)
+                paid.append(payment)
+            else:
+                closed.setdefault(status, []).append(payment)
+
+        if paid:
+            Payment.objects.bulk_update(paid, [
+                'status', 'val_id', 'bank_tran_id', 'card_type',
+                'card_brand', 'transaction_id', 'updated_at',
+            ])
+            confirm_orders(paid, now)
+
+        for status, payments in closed.items():
+            Payment.objects.filter(
+                pk__in=[payment.pk for payment in payments],
+            ).update(status=status, updated_at=now)
+            order_ids = [payment.order_id for payment in payments]
+            Order.objects.filter(pk__in=order_ids).update(
+                status=Order.Status.CANCELED,
+                updated_at=now,
+            )
+            release_orders_stock(order_ids)
+            for payment in payments:
+                payment.status = status
+                emit_payment_closed(payment, order_canceled=True)
+
+    return counts
+
+
+def expire_unpaid_orders(now=None, batch_size=500):
+    """Close orders whose stock hold ran out before they were paid.
+
+    Their pending payment is failed and the order canceled, which hands
+    the stock back; a callback that turns up later finds the payment
+    closed and can't confirm the order. Returns the number of orders
+    closed.
+    """
+    now = now or timezone.now()
+    closed = 0
+    while True:
+        order_ids = expired_order_ids(now, batch_size)
+        if not order_ids:
+            return closed
+        payments = {
+            payment.order_id: payment
+            for payment in Payment.objects.filter(order_id__in=order_ids)
+        }
+        for order_id in order_ids:
+            payment = payments.get(order_id)
+            if payment is not None and abort_payment(
+                payment,
+                Payment.Status.FAILED,
+                cancel_order=True,
+            ):
+                closed += 1
+                continue
+            # No pending payment left: a paid one has committed its stock
+            # by now, anything else just gives it back.
+            release_stock(order_id)
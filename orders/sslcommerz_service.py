@@ -1,22 +1,101 @@
+import threading
 import uuid
+
+import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from sslcommerz_lib import SSLCOMMERZ
 
 
+SESSION_PATH = '/gwprocess/v4/api.php'
+VALIDATION_PATH = '/validator/api/validationserverAPI.php'
+TRANSACTION_PATH = '/validator/api/merchantTransIDvalidationAPI.php'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class SSLCommerzError(Exception):
+    pass
+
+
+def get_http_session():
+    """Process-wide HTTP session for gateway calls.
+
+    Keeps up to ``SSLCOMMERZ_POOL_SIZE`` keep-alive connections open, so
+    checkouts and callbacks skip the TCP and TLS handshake. Requests'
+    sessions are safe to share between threads for plain GET/POST use.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.SSLCOMMERZ_POOL_SIZE,
+                max_retries=0,
+            )
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def api_base_url():
+    if settings.SSLCOMMERZ_API_URL:
+        return settings.SSLCOMMERZ_API_URL.rstrip('/')
+    mode = 'sandbox' if settings.SSLCOMMERZ_IS_SANDBOX else 'securepay'
+    return f"https://{mode}.sslcommerz.com"
+
+
 class SSLCommerzService:
-    def __init__(self):
+    def __init__(self, http=None):
         self.settings = {
             'store_id': settings.SSLCOMMERZ_STORE_ID,
             'store_pass': settings.SSLCOMMERZ_STORE_PASS,
             'issandbox': settings.SSLCOMMERZ_IS_SANDBOX,
         }
         self.sslcz = SSLCOMMERZ(self.settings)
+        self.http = http or get_http_session()
+        self.base_url = api_base_url()
+        self.timeout = (
+            settings.SSLCOMMERZ_CONNECT_TIMEOUT,
+            settings.SSLCOMMERZ_READ_TIMEOUT,
+        )
 
     def generate_tran_id(self):
         return f"TXN-{uuid.uuid4().hex[:16].upper()}"
 
-    def create_payment_session(self, order, customer, address):
-        tran_id = self.generate_tran_id()
+    def call_api(self, method, path, payload):
+        try:
+            if method == 'POST':
+                response = self.http.post(
+                    f"{self.base_url}{path}",
+                    data=payload,
+                    timeout=self.timeout,
+                )
+            else:
+                response = self.http.get(
+                    f"{self.base_url}{path}",
+                    params=payload,
+                    timeout=self.timeout,
+                )
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise SSLCommerzError(str(e)) from e
+
+    def create_session(self, post_body):
+        post_body['store_id'] = self.settings['store_id']
+        post_body['store_passwd'] = self.settings['store_pass']
+        return self.call_api('POST', SESSION_PATH, post_body)
+
+    def create_payment_session(self, order, customer, address, tran_id=None,
+                               num_items=None):
+        tran_id = tran_id or self.generate_tran_id()
+        if num_items is None:
+            num_items = order.items.count()
 
         post_body = {
             'total_amount': float(order.total),
@@ -46,17 +125,48 @@ class SSLCommerzService:
             'ship_state': address.state or '',
             'ship_postcode': address.postal_code or '',
             'ship_country': address.country or 'Bangladesh',
-            'num_of_item': order.items.count(),
+            'num_of_item': num_items,
             'product_name': 'Order Items',
             'product_category': 'General',
             'product_profile': 'general',
         }
 
-        response = self.sslcz.createSession(post_body)
+        response = self.create_session(post_body)
         return tran_id, response
 
     def validate_transaction(self, val_id):
-        return self.sslcz.validationTransactionOrder(val_id)
+        return self.call_api('GET', VALIDATION_PATH, {
+            'val_id': val_id,
+            'store_id': self.settings['store_id'],
+            'store_passwd': self.settings['store_pass'],
+            'format': 'json',
+        })
+
+    def query_transaction(self, tran_id):
+        """Gateway records for ``tran_id``, used when no callback came."""
+        return self.call_api('GET', TRANSACTION_PATH, {
+            'tran_id': tran_id,
+            'store_id': self.settings['store_id'],
+            'store_passwd': self.settings['store_pass'],
+            'format': 'json',
+        })
 
     def validate_ipn(self, post_data):
         return self.sslcz.hash_validate_ipn(post_data)
+
+    # Async variants for ASGI views. The blocking call runs in the shared
+    # thread pool rather than the request's thread, so a slow gateway never
+    # stalls the event loop.
+
+    async def acreate_payment_session(self, order, customer, address,
+                                      tran_id=None, num_items=None):
+        if num_items is None:
+            num_items = await order.items.acount()
+        return await sync_to_async(
+            self.create_payment_session, thread_sensitive=False
+        )(order, customer, address, tran_id, num_items)
+
+    async def avalidate_transaction(self, val_id):
+        return await sync_to_async(
+            self.validate_transaction, thread_sensitive=False
+        )(val_id)
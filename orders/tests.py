@@ -1,3 +1,38 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from core.testing import QueryBudgetMixin
+from customers.models import Address, Customer
+from products.tests import (
+    fill_cart,
+    google_login,
+    reset_process_indexes,
+    seed_catalog,
+)
+
+
+@google_login
+class CheckoutQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _, cls.products = seed_catalog()
+        cls.user = User.objects.create_user('shopper', 'shopper@example.com', 'pw')
+        customer = Customer.objects.create(user=cls.user)
+        Address.objects.create(customer=customer, address_line1='1 Test Road')
+
+    def setUp(self):
+        reset_process_indexes()
+
+    def test_checkout(self):
+        self.client.force_login(self.user)
+        fill_cart(self.client, self.products)
+        self.client.get(reverse('checkout'))
+        response = self.assertQueryBudget('checkout')
+        self.assertEqual(response.context['address'].address_line1, '1 Test Road')
+
+    def test_guest_checkout(self):
+        fill_cart(self.client, self.products)
+        self.client.get(reverse('checkout'))
+        response = self.assertQueryBudget('checkout')
+        self.assertIsNone(response.context['address'])
@@ -4,10 +4,10 @@ from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.http import HttpResponse
-from decimal import Decimal
 
-from orders.models import Order, Payment
-from orders.sslcommerz_service import SSLCommerzService
+from orders.models import Payment
+from orders.payment_service import abort_payment, finalize_payment
+from orders.sslcommerz_service import SSLCommerzError, SSLCommerzService
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -15,20 +15,28 @@ class SSLCommerzSuccessView(View):
     def post(self, request):
         tran_id = request.POST.get('tran_id')
         val_id = request.POST.get('val_id')
-        card_type = request.POST.get('card_type')
-        card_brand = request.POST.get('card_brand')
-        bank_tran_id = request.POST.get('bank_tran_id')
 
         if not tran_id or not val_id:
             messages.error(request, 'Invalid payment response.')
             return redirect('cart')
 
         try:
-            payment = Payment.objects.get(tran_id=tran_id)
+            payment = Payment.objects.select_related('order').get(
+                tran_id=tran_id
+            )
         except Payment.DoesNotExist:
             messages.error(request, 'Payment not found.')
             return redirect('cart')
 
+        try:
+            finalize_payment(payment, val_id, request.POST)
+        except SSLCommerzError:
+            messages.error(
+                request,
+                'Could not reach the payment gateway. Please try again.'
+            )
+            return redirect('cart')
+
         if payment.status == Payment.Status.PAID:
             context = {
                 'order': payment.order,
@@ -36,36 +44,8 @@ class SSLCommerzSuccessView(View):
             }
             return render(request, 'sslcommerz/success.html', context)
 
-        sslcz_service = SSLCommerzService()
-        validation_response = sslcz_service.validate_transaction(val_id)
-
-        if (
-            validation_response.get('status') == 'VALID'
-            and Decimal(validation_response.get('amount', 0)) == payment.amount
-            and validation_response.get('tran_id') == tran_id
-        ):
-            payment.status = Payment.Status.PAID
-            payment.val_id = val_id
-            payment.bank_tran_id = bank_tran_id
-            payment.card_type = card_type
-            payment.card_brand = card_brand
-            payment.transaction_id = bank_tran_id
-            payment.save()
-
-            order = payment.order
-            order.status = Order.Status.CONFIRMED
-            order.save()
-
-            context = {
-                'order': order,
-                'payment': payment,
-            }
-            return render(request, 'sslcommerz/success.html', context)
-        else:
-            payment.status = Payment.Status.FAILED
-            payment.save()
-            messages.error(request, 'Payment validation failed.')
-            return redirect('cart')
+        messages.error(request, 'Payment validation failed.')
+        return redirect('cart')
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -76,10 +56,11 @@ class SSLCommerzFailView(View):
         if tran_id:
             try:
                 payment = Payment.objects.get(tran_id=tran_id)
-                payment.status = Payment.Status.FAILED
-                payment.save()
-                payment.order.status = "canceled"
-                payment.order.save()
+                abort_payment(
+                    payment,
+                    Payment.Status.FAILED,
+                    cancel_order=True,
+                )
             except Payment.DoesNotExist:
                 pass
 
@@ -94,8 +75,7 @@ class SSLCommerzCancelView(View):
         if tran_id:
             try:
                 payment = Payment.objects.get(tran_id=tran_id)
-                payment.status = Payment.Status.CANCELED
-                payment.save()
+                abort_payment(payment, Payment.Status.CANCELED)
             except Payment.DoesNotExist:
                 pass
 
@@ -124,27 +104,12 @@ class SSLCommerzIPNView(View):
         if not sslcz_service.validate_ipn(request.POST.dict()):
             return HttpResponse('Hash validation failed', status=400)
 
-        validation_response = sslcz_service.validate_transaction(val_id)
-
-        if (
-            validation_response.get('status') == 'VALID'
-            and Decimal(validation_response.get('amount', 0)) == payment.amount
-            and validation_response.get('tran_id') == tran_id
-        ):
-            payment.status = Payment.Status.PAID
-            payment.val_id = val_id
-            payment.bank_tran_id = request.POST.get('bank_tran_id')
-            payment.card_type = request.POST.get('card_type')
-            payment.card_brand = request.POST.get('card_brand')
-            payment.transaction_id = request.POST.get('bank_tran_id')
-            payment.save()
-
-            order = payment.order
-            order.status = Order.Status.CONFIRMED
-            order.save()
+        try:
+            finalize_payment(payment, val_id, request.POST, sslcz_service)
+        except SSLCommerzError:
+            # Let the gateway retry the notification later.
+            return HttpResponse('Gateway unavailable', status=503)
 
+        if payment.status == Payment.Status.PAID:
             return HttpResponse('IPN processed successfully', status=200)
-        else:
-            payment.status = Payment.Status.FAILED
-            payment.save()
-            return HttpResponse('Validation failed', status=400)
+        return HttpResponse('Validation failed', status=400)
@@ -9,11 +9,25 @@ from products.models import (
     ProductImage
 )
 
+
 admin.site.register(Product)
 admin.site.register(ProductVariant)
 admin.site.register(Category)
-admin.site.register(Cart)
 admin.site.register(CartItem)
-admin.site.register(Wishlist)
-admin.site.register(ProductImage)
 
+
+# The select_related below covers what each model's __str__ reads, so
+# changelists don't run a query per row.
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_select_related = ['customer__user']
+
+
+@admin.register(Wishlist)
+class WishlistAdmin(admin.ModelAdmin):
+    list_select_related = ['customer__user', 'product']
+
+
+@admin.register(ProductImage)
+class ProductImageAdmin(admin.ModelAdmin):
+    list_select_related = ['product']
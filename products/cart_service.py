@@ -0,0 +1,162 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from core.maintenance import raw_delete
+from customers.middleware import get_customer
+from products.models import Cart, CartItem
+
+
+SESSION_CART_KEY = 'cart_id'
+
+
+def effective_price_expression(prefix=''):
+    """Database-side equivalent of ``Product.current_price``.
+
+    A zero or missing discount falls back to the base price, just like the
+    Python property does.
+    """
+    return Coalesce(
+        NullIf(F(f'{prefix}discount_price'), 0),
+        F(f'{prefix}base_price'),
+    )
+
+
+def get_request_cart(request, create=False):
+    """The current shopper's cart, or ``None`` if they don't have one yet.
+
+    Customers' carts belong to their account; everyone else's to their
+    session. Looking a cart up never writes anything: a session and cart
+    are only created with ``create=True``, i.e. on the first add-to-cart,
+    so crawlers and window shoppers cost no writes. Anonymous sessions
+    remember their cart id, so visitors without a cart cost no query
+    either. The cart is looked up at most once per request, so views and
+    the header context processor share it.
+    """
+    cart = getattr(request, '_cached_cart', None)
+    if cart is None and (create or not hasattr(request, '_cached_cart')):
+        cart = _find_cart(request, create)
+        request._cached_cart = cart
+    return cart
+
+
+def _find_cart(request, create):
+    customer = get_customer(request)
+    if customer is not None:
+        if create:
+            cart, _ = Cart.objects.get_or_create(customer=customer)
+            return cart
+        return Cart.objects.filter(customer=customer).first()
+
+    session = request.session
+    cart_id = session.get(SESSION_CART_KEY)
+    if cart_id is not None:
+        cart = Cart.objects.filter(
+            pk=cart_id,
+            session_id=session.session_key,
+        ).first()
+        if cart is not None or not create:
+            return cart
+    elif session.session_key and SESSION_CART_KEY not in session:
+        # Carts created before the id was kept in the session are only
+        # known by session key. Look once per session and remember the
+        # answer, so later requests skip this query.
+        cart = Cart.objects.filter(
+            session_id=session.session_key,
+            customer=None,
+        ).first()
+        session[SESSION_CART_KEY] = cart.pk if cart is not None else None
+        if cart is not None:
+            return cart
+
+    if not create:
+        return None
+
+    if not session.session_key:
+        session.create()
+    cart, _ = Cart.objects.get_or_create(session_id=session.session_key)
+    session[SESSION_CART_KEY] = cart.pk
+    return cart
+
+
+def get_cart_summary(cart):
+    if cart is None or cart.pk is None:
+        return {'items_count': 0, 'total': Decimal('0')}
+    return {'items_count': cart.items_count, 'total': cart.subtotal}
+
+
+def apply_cart_delta(cart_id, quantity, amount):
+    """Shift the stored cart totals by ``quantity`` items and ``amount``."""
+    Cart.objects.filter(pk=cart_id).update(
+        items_count=F('items_count') + quantity,
+        subtotal=F('subtotal') + amount,
+        updated_at=timezone.now(),
+    )
+
+
+def add_item(cart, variant_id, quantity, unit_price):
+    """Add ``quantity`` of the variant to the cart and bump its totals.
+
+    Both the line and the cart are updated with F-expressions, so two
+    concurrent adds never lose an increment. A new line is inserted with
+    ``bulk_create``, which sends no ``post_save``: the signal's full resync
+    would otherwise rewrite the totals from the lines and could overwrite
+    a concurrent add's delta.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        updated = CartItem.objects.filter(
+            cart=cart,
+            variant_id=variant_id,
+        ).update(quantity=F('quantity') + quantity, updated_at=now)
+        if not updated:
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, variant_id=variant_id, quantity=quantity)
+            ])
+        apply_cart_delta(cart.pk, quantity, unit_price * quantity)
+
+
+def clear_cart(cart):
+    # A plain DELETE: the ORM's delete() sends post_delete per line, and
+    # each one would recalculate the whole cart.
+    with transaction.atomic():
+        raw_delete(CartItem, 'cart_id', [cart.pk])
+        Cart.objects.filter(pk=cart.pk).update(
+            items_count=0,
+            subtotal=0,
+            updated_at=timezone.now(),
+        )
+
+
+def recalculate_cart_totals(carts=None):
+    """Recompute stored totals from the cart lines in a single UPDATE.
+
+    ``carts`` is an optional Cart queryset; all carts are refreshed when it
+    is omitted. Returns the number of carts updated.
+    """
+    if carts is None:
+        carts = Cart.objects.all()
+
+    lines = CartItem.objects.filter(
+        cart=OuterRef('pk'),
+        variant__isnull=False,
+    ).order_by().values('cart')
+    items_count = lines.annotate(value=Sum('quantity')).values('value')
+    subtotal = lines.annotate(
+        value=Sum(
+            F('quantity') * effective_price_expression('variant__product__'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    ).values('value')
+
+    return carts.update(
+        items_count=Coalesce(Subquery(items_count), 0),
+        subtotal=Coalesce(
+            Subquery(subtotal),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
@@ -0,0 +1,107 @@
+import threading
+from collections import defaultdict
+
+from core.cache_versions import bump_version, get_version
+from products.models import Category
+
+
+TREE_VERSION = 'category_tree'
+
+_lock = threading.Lock()
+_tree = None
+_tree_version = None
+
+
+class CategoryTree:
+    """The whole Category hierarchy, loaded with a single query.
+
+    Instances are shared between requests, so treat the categories they hold
+    as read-only.
+    """
+
+    def __init__(self, categories):
+        self.by_id = {category.pk: category for category in categories}
+        self.by_slug = {
+            category.slug: category for category in categories
+            if category.slug
+        }
+        self._children = defaultdict(list)
+        self.roots = []
+
+        for category in categories:
+            parent = self.by_id.get(category.parent_id)
+            if parent is None:
+                self.roots.append(category)
+            else:
+                # Prime the FK cache so ``category.parent`` never queries.
+                category.parent = parent
+                self._children[parent.pk].append(category)
+
+    @property
+    def menu(self):
+        return [category for category in self.roots if category.is_active]
+
+    def get(self, slug):
+        return self.by_slug.get(slug)
+
+    def children(self, category, active_only=True):
+        children = self._children.get(category.pk, [])
+        if active_only:
+            return [child for child in children if child.is_active]
+        return list(children)
+
+    def ancestors(self, category):
+        """Ancestors of ``category``, starting from its root."""
+        ancestors = []
+        parent = self.by_id.get(category.parent_id)
+        while parent is not None and parent not in ancestors:
+            ancestors.insert(0, parent)
+            parent = self.by_id.get(parent.parent_id)
+        return ancestors
+
+    def breadcrumbs(self, category):
+        return self.ancestors(category) + [category]
+
+    def descendant_ids(self, category, include_self=True):
+        """Primary keys of the subtree rooted at ``category``.
+
+        Follows the parent links already in memory rather than ``path``,
+        which is empty for rows written by ``bulk_create`` or ``loaddata``
+        (an empty prefix would match every category).
+        """
+        ids = [node.pk for node in self.descendants(category)]
+        if include_self:
+            ids.insert(0, category.pk)
+        return ids
+
+    def descendants(self, category):
+        descendants = []
+        seen = {category.pk}
+        stack = list(reversed(self._children.get(category.pk, [])))
+        while stack:
+            child = stack.pop()
+            if child.pk in seen:
+                continue
+            seen.add(child.pk)
+            descendants.append(child)
+            stack.extend(reversed(self._children.get(child.pk, [])))
+        return descendants
+
+
+def get_category_tree():
+    """Return the process-local tree, rebuilding it when it is stale."""
+    global _tree, _tree_version
+
+    version = get_version(TREE_VERSION)
+    if _tree is not None and _tree_version == version:
+        return _tree
+
+    with _lock:
+        if _tree is None or _tree_version != version:
+            _tree = CategoryTree(list(Category.objects.order_by('pk')))
+            _tree_version = version
+        return _tree
+
+
+def invalidate_category_tree():
+    bump_version(TREE_VERSION)
@@ -1,12 +1,12 @@
-from products.models import Category, Cart, Wishlist
+from customers.middleware import get_customer, is_shopper
+from products.models import Wishlist
+from products.cart_service import get_cart_summary, get_request_cart
+from products.category_tree import get_category_tree
 
 
 def category_context(request):
-    categories = Category.objects.filter(
-        is_active=True, parent__isnull=True
-    )
     return {
-        'main_menu': categories,
+        'main_menu': get_category_tree().menu,
     }
 
 
@@ -17,38 +17,18 @@ def cart_context(request):
     - Authenticated customers: Cart tied to user account
     - Anonymous users: Cart tied to session ID
     - Admin/Staff users: No cart (they don't shop)
-    - Prevents null session_id by forcing session creation
+    - Visitors who never added anything get an empty summary; no session
+      or cart is created just to render the header
     """
-    cart_items_count = 0
-    cart_total = 0
     cart = None
+    if is_shopper(request.user) or not request.user.is_authenticated:
+        cart = get_request_cart(request)
 
-    if request.user.is_authenticated:
-        # Skip cart creation for admin/staff users
-        if not (request.user.is_staff or request.user.is_superuser):
-            # Regular authenticated customers: cart tied to user account
-            cart, created = Cart.objects.get_or_create(
-                customer__user=request.user
-            )
-            cart_items_count = cart.total_items
-            cart_total = cart.total_price
-    else:
-        # Anonymous users: cart tied to session
-        # Force session creation if it doesn't exist (prevents null session_id)
-        if not request.session.session_key:
-            request.session.create()
-
-        # Now safely create/get cart with valid session_id
-        cart, created = Cart.objects.get_or_create(
-            session_id=request.session.session_key
-        )
-        cart_items_count = cart.total_items
-        cart_total = cart.total_price
-
+    summary = get_cart_summary(cart)
     return {
         'header_cart': cart,
-        'header_cart_items_count': cart_items_count,
-        'header_cart_total': cart_total,
+        'header_cart_items_count': summary['items_count'],
+        'header_cart_total': summary['total'],
     }
 
 
@@ -57,11 +37,9 @@ def wishlist_context(request):
     wishlist_count = 0
 
     # Only show wishlist for regular customers, not admin/staff
-    if request.user.is_authenticated:
-        if not (request.user.is_staff or request.user.is_superuser):
-            wishlist_count = Wishlist.objects.filter(
-                customer__user=request.user
-            ).count()
+    customer = get_customer(request)
+    if customer is not None:
+        wishlist_count = Wishlist.objects.filter(customer=customer).count()
 
     return {
         'header_wishlist_count': wishlist_count,
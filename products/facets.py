@@ -0,0 +1,283 @@
+"""In-memory facet index for the product listing.
+
+Every active product is entered into one id set per facet value (size,
+color, price bucket) and per category. Filtering and facet counts are set
+intersections; the matching ids are put in listing order in memory, so
+the listing only has to fetch the products on the page being shown. The
+unfiltered counts shown in the sidebar are cached per category until the
+index changes.
+
+The index follows the same process-local + shared-version scheme as the
+category tree: the worker that handles a catalog change applies it to a
+copy, swaps the copy in and bumps ``facet_index``; the others rebuild from
+the database on their next read. A published index is never modified, so
+requests can read it without taking the lock.
+"""
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+
+from core.cache_versions import bump_version, get_version
+from products.models import Product, ProductVariant
+
+
+INDEX_VERSION = 'facet_index'
+FACETS = (
+    ('size', 'Size'),
+    ('color', 'Color'),
+    ('price', 'Price'),
+)
+
+_lock = threading.RLock()
+_index = None
+_index_version = None
+
+
+def price_bucket(price):
+    """Label of the ``PRODUCT_PRICE_BUCKETS`` range containing ``price``."""
+    bounds = settings.PRODUCT_PRICE_BUCKETS
+    for lower, upper in zip(bounds, bounds[1:]):
+        if price < upper:
+            return f"{lower}-{upper}"
+    return f"{bounds[-1]}+"
+
+
+def price_bucket_labels():
+    bounds = settings.PRODUCT_PRICE_BUCKETS
+    labels = [f"{lower}-{upper}" for lower, upper in zip(bounds, bounds[1:])]
+    return labels + [f"{bounds[-1]}+"]
+
+
+class FacetIndex:
+    def __init__(self):
+        self.values = {name: defaultdict(set) for name, _ in FACETS}
+        self.categories = defaultdict(set)
+        self.products = {}
+        self._counts = {}
+        self._ordering = None
+
+    def copy(self):
+        index = FacetIndex()
+        for name, values in self.values.items():
+            for value, product_ids in values.items():
+                index.values[name][value] = set(product_ids)
+        for category_id, product_ids in self.categories.items():
+            index.categories[category_id] = set(product_ids)
+        index.products = dict(self.products)
+        return index
+
+    def add(self, product_id, sort_key, category_id, facet_values):
+        self.remove(product_id)
+        self._counts.clear()
+        self._ordering = None
+        self.products[product_id] = (sort_key, category_id, facet_values)
+        self.categories[category_id].add(product_id)
+        for name, values in facet_values.items():
+            for value in values:
+                self.values[name][value].add(product_id)
+
+    def remove(self, product_id):
+        entry = self.products.pop(product_id, None)
+        if entry is None:
+            return
+        self._counts.clear()
+        self._ordering = None
+        _, category_id, facet_values = entry
+        self.categories[category_id].discard(product_id)
+        for name, values in facet_values.items():
+            for value in values:
+                self.values[name][value].discard(product_id)
+
+    def _matching(self, name, selected_values):
+        matching = set()
+        for value in selected_values:
+            matching |= self.values[name].get(value, set())
+        return matching
+
+    def ordering(self):
+        """Every product id in listing order, and each id's position.
+
+        Sorted once per index rather than once per request.
+        """
+        ordering = self._ordering
+        if ordering is None:
+            order = sorted(self.products, key=lambda pk: self.products[pk][0])
+            ordering = (order, {pk: i for i, pk in enumerate(order)})
+            self._ordering = ordering
+        return ordering
+
+    def in_order(self, product_ids):
+        order, rank = self.ordering()
+        if len(product_ids) * 8 > len(order):
+            # A large share of the catalog: one pass beats a sort.
+            return [pk for pk in order if pk in product_ids]
+        return sorted(product_ids, key=rank.__getitem__)
+
+    def _candidates(self, category_ids):
+        candidates = set()
+        for category_id in category_ids:
+            candidates |= self.categories.get(category_id, set())
+        return candidates
+
+    def counts(self, category_ids=None):
+        """Count every facet value with nothing selected."""
+        key = None if category_ids is None else frozenset(category_ids)
+        counts = self._counts.get(key)
+        if counts is None:
+            candidates = None if key is None else self._candidates(key)
+            counts = {
+                name: {
+                    value: (
+                        len(product_ids) if candidates is None
+                        else len(product_ids & candidates)
+                    )
+                    for value, product_ids in self.values[name].items()
+                    if product_ids
+                }
+                for name, _ in FACETS
+            }
+            self._counts[key] = counts
+        return counts
+
+    def filter(self, selected, category_ids=None):
+        """Apply facet filters and count every facet value.
+
+        ``selected`` maps a facet name to the values chosen for it; values
+        of one facet are OR-ed together and different facets are AND-ed.
+        Counts for a facet ignore that facet's own selection, so shoppers
+        can see what widening it would give them. Returns the matching ids
+        in listing order (newest first) and the counts.
+        """
+        candidates = None
+        if category_ids is not None:
+            candidates = self._candidates(category_ids)
+
+        matches = {
+            name: self._matching(name, values)
+            for name, values in selected.items() if values
+        }
+
+        result = _intersect(candidates, matches.values())
+
+        counts = {}
+        for name, _ in FACETS:
+            base = _intersect(candidates, [
+                matching for other, matching in matches.items()
+                if other != name
+            ])
+            counts[name] = {
+                value: (
+                    len(product_ids) if base is None
+                    else len(product_ids & base)
+                )
+                for value, product_ids in self.values[name].items()
+                if product_ids
+            }
+
+        if result is None:
+            return list(self.ordering()[0]), counts
+        return self.in_order(result), counts
+
+
+def _intersect(candidates, id_sets):
+    """Intersection of ``candidates`` and ``id_sets`` as a new set.
+
+    ``candidates`` of None stands for the whole catalog, which is never
+    copied; the result is then None if ``id_sets`` is empty as well.
+    """
+    id_sets = sorted(id_sets, key=len)
+    if candidates is not None:
+        id_sets.insert(0, candidates)
+    if not id_sets:
+        return None
+    result = set(id_sets[0])
+    for product_ids in id_sets[1:]:
+        result &= product_ids
+    return result
+
+
+def load_entries(product_ids=None):
+    """Index entries for active products; two queries in total."""
+    products = Product.objects.filter(is_active=True)
+    variants = ProductVariant.objects.filter(
+        is_active=True,
+        product__is_active=True,
+    )
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        variants = variants.filter(product_id__in=product_ids)
+
+    sizes = defaultdict(set)
+    colors = defaultdict(set)
+    for product_id, size, color in variants.values_list(
+        'product_id', 'size', 'color'
+    ).iterator(chunk_size=5000):
+        if size:
+            sizes[product_id].add(size)
+        if color:
+            colors[product_id].add(color)
+
+    entries = {}
+    for pk, created_at, category_id, base_price, discount_price in (
+        products.values_list(
+            'pk', 'created_at', 'category_id', 'base_price', 'discount_price'
+        ).iterator(chunk_size=5000)
+    ):
+        price = discount_price or base_price or Decimal('0')
+        entries[pk] = (
+            (-created_at.timestamp(), -pk),
+            category_id,
+            {
+                'size': frozenset(sizes.get(pk, ())),
+                'color': frozenset(colors.get(pk, ())),
+                'price': frozenset([price_bucket(price)]),
+            },
+        )
+    return entries
+
+
+def build_index():
+    index = FacetIndex()
+    for product_id, entry in load_entries().items():
+        index.add(product_id, *entry)
+    return index
+
+
+def get_facet_index():
+    global _index, _index_version
+
+    version = get_version(INDEX_VERSION)
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = build_index()
+            _index_version = version
+        return _index
+
+
+def update_products(product_ids):
+    global _index, _index_version
+
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    with _lock:
+        index = get_facet_index().copy()
+        entries = load_entries(product_ids)
+        for product_id in product_ids:
+            if product_id in entries:
+                index.add(product_id, *entries[product_id])
+            else:
+                index.remove(product_id)
+        _index = index
+
+        version = bump_version(INDEX_VERSION)
+        if version != _index_version + 1:
+            # Another worker changed the catalog too; rebuild on next read.
+            _index = None
+        _index_version = version
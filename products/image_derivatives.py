@@ -0,0 +1,172 @@
+"""Resized copies of uploaded images for responsive ``srcset`` markup.
+
+Derivatives live under ``IMAGE_DERIVATIVE_DIR`` inside the media root, in a
+directory keyed on the stored image name. Django's storage never overwrites
+an existing name (new uploads get a unique suffix), so a name always refers
+to the same content and its derivatives never need invalidating.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import ExifTags, Image, ImageOps
+
+
+FORMAT_EXTENSIONS = {
+    'WEBP': 'webp',
+    'AVIF': 'avif',
+    'JPEG': 'jpg',
+}
+MANIFEST_NAME = 'manifest.json'
+
+_executor = None
+_executor_lock = threading.Lock()
+# Finished srcsets never change, so each worker memoizes them instead of
+# making a cache round trip per image on every listing.
+_srcsets = {}
+
+
+def derivative_dir(name):
+    key = hashlib.sha256(name.encode()).hexdigest()
+    return f"{settings.IMAGE_DERIVATIVE_DIR}/{key[:2]}/{key}"
+
+
+def derivative_options():
+    image_format = settings.IMAGE_DERIVATIVE_FORMAT.upper()
+    return {
+        'widths': sorted(settings.IMAGE_DERIVATIVE_WIDTHS),
+        'image_format': image_format,
+        'extension': FORMAT_EXTENSIONS.get(image_format, image_format.lower()),
+        'quality': settings.IMAGE_DERIVATIVE_QUALITY,
+    }
+
+
+def is_generated(name):
+    return default_storage.exists(f"{derivative_dir(name)}/{MANIFEST_NAME}")
+
+
+def render_derivatives(source_path, target_dir, widths, image_format,
+                       extension, quality):
+    """Write one resized copy per width below the source width.
+
+    Runs inside a worker process, so it only touches the filesystem. Every
+    file is written to a temporary name and renamed into place, and the
+    manifest is written last, which makes an interrupted run safe to resume.
+    The manifest also records the source width, for the original's
+    ``srcset`` entry.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    generated = []
+
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source)
+        source_width = image.width
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        for width in widths:
+            if width >= image.width:
+                break
+            target = os.path.join(target_dir, f"{width}w.{extension}")
+            if not os.path.exists(target):
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+                temp = f"{target}.{os.getpid()}.tmp"
+                resized.save(temp, format=image_format, quality=quality)
+                os.replace(temp, target)
+            generated.append(width)
+
+    manifest = os.path.join(target_dir, MANIFEST_NAME)
+    temp = f"{manifest}.{os.getpid()}.tmp"
+    with open(temp, 'w') as handle:
+        json.dump({
+            'widths': generated,
+            'extension': extension,
+            'source_width': source_width,
+        }, handle)
+    os.replace(temp, manifest)
+    return generated
+
+
+def source_width(name):
+    """Displayed width of the stored image, for manifests written before
+    they recorded it."""
+    with default_storage.open(name) as handle, Image.open(handle) as image:
+        # Only the header is read. Orientations 5-8 are rotated by 90
+        # degrees when displayed.
+        orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+        return image.height if orientation in (5, 6, 7, 8) else image.width
+
+
+def derivative_job(name):
+    """Arguments for ``render_derivatives`` for the stored image ``name``."""
+    options = derivative_options()
+    return (
+        default_storage.path(name),
+        default_storage.path(derivative_dir(name)),
+        options['widths'],
+        options['image_format'],
+        options['extension'],
+        options['quality'],
+    )
+
+
+def get_executor():
+    """Shared process pool for derivatives scheduled from web requests.
+
+    Uses the ``spawn`` start method so workers never inherit the server's
+    threads, locks or database connections.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def schedule_derivatives(name):
+    if not name or is_generated(name):
+        return None
+    return get_executor().submit(render_derivatives, *derivative_job(name))
+
+
+def srcset_for(name):
+    """``srcset`` value for the stored image ``name``.
+
+    Returns an empty string until the derivatives exist; the result is
+    kept in process memory once they do, since derivatives of a name
+    never change.
+    """
+    if not name:
+        return ''
+    srcset = _srcsets.get(name)
+    if srcset is not None:
+        return srcset
+
+    directory = derivative_dir(name)
+    manifest_name = f"{directory}/{MANIFEST_NAME}"
+    if not default_storage.exists(manifest_name):
+        return ''
+
+    with default_storage.open(manifest_name) as handle:
+        manifest = json.load(handle)
+    extension = manifest['extension']
+    candidates = [
+        f"{default_storage.url(f'{directory}/{width}w.{extension}')} {width}w"
+        for width in manifest['widths']
+    ]
+    # The original is the largest candidate; without it browsers on wide or
+    # high-density screens would upscale the biggest derivative.
+    width = manifest.get('source_width') or source_width(name)
+    candidates.append(f"{default_storage.url(name)} {width}w")
+    srcset = ', '.join(candidates)
+    _srcsets[name] = srcset
+    return srcset
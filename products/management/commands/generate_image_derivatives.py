@@ -0,0 +1,91 @@
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    wait,
+)
+
+from django.core.management.base import BaseCommand
+
+from products.image_derivatives import (
+    derivative_job,
+    is_generated,
+    render_derivatives,
+)
+from products.models import Category, ProductImage, ProductVariant
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate responsive image derivatives for every product, variant '
+        'and category image. Images that already have derivatives are '
+        'skipped, so an interrupted run can simply be started again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (defaults to all cores).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def iter_image_names(self, chunk_size):
+        for model in (ProductImage, ProductVariant, Category):
+            names = (
+                model.objects.exclude(image='')
+                .exclude(image__isnull=True)
+                .order_by('pk')
+                .values_list('image', flat=True)
+            )
+            yield from names.iterator(chunk_size=chunk_size)
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        max_pending = workers * 4
+        started = time.monotonic()
+        done = skipped = failed = reported = 0
+        pending = {}
+
+        def collect(futures):
+            nonlocal done, failed
+            for future in futures:
+                name = pending.pop(future)
+                try:
+                    future.result()
+                    done += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{name}: {exc}')
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for name in self.iter_image_names(options['chunk_size']):
+                if is_generated(name):
+                    skipped += 1
+                    continue
+
+                future = executor.submit(
+                    render_derivatives, *derivative_job(name)
+                )
+                pending[future] = name
+
+                if len(pending) >= max_pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                    if done - reported >= 500:
+                        reported = done
+                        rate = done / (time.monotonic() - started)
+                        self.stdout.write(
+                            f'{done} images processed ({rate:.1f}/s)'
+                        )
+
+            finished, _ = wait(pending)
+            collect(finished)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {done} images, skipped {skipped}, failed {failed} '
+            f'in {elapsed:.1f}s.'
+        ))
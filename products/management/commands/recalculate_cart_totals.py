@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Cart
+from products.cart_service import recalculate_cart_totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored items_count and subtotal of every cart.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        updated = 0
+
+        while True:
+            pks = list(
+                Cart.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            updated += recalculate_cart_totals(
+                Cart.objects.filter(pk__in=pks)
+            )
+            last_pk = pks[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Recalculated totals for {updated} carts.')
+        )
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:13
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('products', 'Cart')
+    CartItem = apps.get_model('products', 'CartItem')
+
+    lines = CartItem.objects.filter(
+        cart=OuterRef('pk'),
+        variant__isnull=False,
+    ).order_by().values('cart')
+    price = Coalesce(
+        NullIf(F('variant__product__discount_price'), 0),
+        F('variant__product__base_price'),
+    )
+    Cart.objects.update(
+        items_count=Coalesce(
+            Subquery(lines.annotate(value=Sum('quantity')).values('value')),
+            0,
+        ),
+        subtotal=Coalesce(
+            Subquery(
+                lines.annotate(
+                    value=Sum(
+                        F('quantity') * price,
+                        output_field=DecimalField(
+                            max_digits=12, decimal_places=2
+                        ),
+                    )
+                ).values('value')
+            ),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_category_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
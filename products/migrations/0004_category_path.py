@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+def backfill_category_paths(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    categories = {
+        category.pk: category for category in Category.objects.all()
+    }
+
+    def build_path(category, seen=()):
+        if category.path:
+            return category.path
+        parent = categories.get(category.parent_id)
+        if parent is None or parent.pk in seen:
+            prefix = '/'
+        else:
+            prefix = build_path(parent, seen + (category.pk,))
+        category.path = f"{prefix}{category.pk}/"
+        return category.path
+
+    for category in categories.values():
+        build_path(category)
+    Category.objects.bulk_update(categories.values(), ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_cart_items_count_cart_subtotal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(
+            backfill_category_paths, migrations.RunPython.noop
+        ),
+    ]
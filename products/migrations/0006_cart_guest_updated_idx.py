@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_active_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(condition=models.Q(('customer__isnull', True)), fields=['updated_at'], name='cart_guest_updated_idx'),
+        ),
+    ]
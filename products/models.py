@@ -1,5 +1,7 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Concat, Substr
 from customers.models import Customer
 
 
@@ -20,6 +22,14 @@ class Category(models.Model):
         related_name='children'
     )
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    # Materialized path of primary keys from the root, e.g. "/1/5/12/".
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True
+    )
     is_active = models.BooleanField(default=True)
     is_menu = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -32,11 +42,89 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def build_path(self):
+        # Read the parent's path from the database; an in-memory parent may
+        # be stale after a re-parenting elsewhere in its ancestry.
+        prefix = '/'
+        if self.parent_id:
+            prefix = Category.objects.filter(
+                pk=self.parent_id
+            ).values_list('path', flat=True).get()
+        return f"{prefix}{self.pk}/"
+
+    def get_descendants(self, include_self=True):
+        if not self.path:
+            # Written without save() (bulk_create, loaddata): an empty
+            # prefix would match every category, so use the parent links.
+            from products.category_tree import get_category_tree
+
+            tree = get_category_tree()
+            node = tree.by_id.get(self.pk, self)
+            return Category.objects.filter(
+                pk__in=tree.descendant_ids(node, include_self)
+            )
+        categories = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            categories = categories.exclude(pk=self.pk)
+        return categories
+
     def save(self, *args, **kwargs):
         if not self.slug:
             without_space = self.name.replace(' ', '-')
             self.slug = without_space.lower()
-        return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            if self.pk is None:
+                super().save(*args, **kwargs)
+                self.path = self.build_path()
+                Category.objects.filter(pk=self.pk).update(path=self.path)
+                return
+
+            old_path = Category.objects.filter(
+                pk=self.pk
+            ).values_list('path', flat=True).first()
+            new_path = self.build_path()
+            if old_path and new_path.startswith(old_path) and (
+                new_path != old_path
+            ):
+                raise ValueError(
+                    'A category cannot be moved under itself or its '
+                    'descendants.'
+                )
+            self.path = new_path
+
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'path'}
+            super().save(*args, **kwargs)
+
+            if old_path and old_path != self.path:
+                # Re-parented: rewrite the prefix of every descendant.
+                Category.objects.filter(
+                    path__startswith=old_path
+                ).exclude(pk=self.pk).update(
+                    path=Concat(
+                        Value(self.path),
+                        Substr('path', len(old_path) + 1)
+                    )
+                )
+
+
+def primary_image_subquery(product_ref='pk'):
+    """Image name of a product's primary image, for use in annotations.
+
+    Prefers images flagged ``is_primary``, then the lowest ``sort_order``.
+    """
+    return Subquery(
+        ProductImage.objects.filter(
+            product=OuterRef(product_ref)
+        ).order_by('-is_primary', 'sort_order', 'pk').values('image')[:1]
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_primary_image(self):
+        return self.annotate(primary_image_name=primary_image_subquery())
 
 
 class Product(models.Model):
@@ -62,6 +150,24 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the listing: (created_at, id) newest first.
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='product_active_recent_idx',
+            ),
+            # The same listing filtered to a category subtree.
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='product_active_category_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -75,11 +181,23 @@ class Product(models.Model):
     def in_stock(self):
         pass
 
+    @property
+    def default_image_name(self):
+        # Querysets built with ``with_primary_image()`` already carry the
+        # name; otherwise look it up once and keep it on the instance.
+        if not hasattr(self, 'primary_image_name'):
+            self.primary_image_name = ProductImage.objects.filter(
+                product=self
+            ).order_by('-is_primary', 'sort_order', 'pk').values_list(
+                'image', flat=True
+            ).first()
+        return self.primary_image_name
+
     @property
     def default_image(self):
-        images = ProductImage.objects.filter(product=self)
-        if images.exists():
-            return images.first().image.url
+        name = self.default_image_name
+        if name:
+            return ProductImage._meta.get_field('image').storage.url(name)
         return None
 
 
@@ -139,9 +257,27 @@ class Cart(models.Model):
         null=True
     )
     session_id = models.CharField(max_length=512, blank=True, null=True)
+    items_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Guest carts by age, for purge_stale_data.
+            models.Index(
+                fields=['updated_at'],
+                name='cart_guest_updated_idx',
+                condition=models.Q(customer__isnull=True),
+            ),
+            # Guest cart lookup on the first add-to-cart.
+            models.Index(
+                fields=['session_id'],
+                name='cart_session_idx',
+                condition=models.Q(session_id__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         if self.customer:
             return f"Cart for {self.customer.user.email}"
@@ -150,11 +286,11 @@ class Cart(models.Model):
 
     @property
     def total_price(self):
-        return sum(item.subtotal for item in self.items.all())
+        return self.subtotal
 
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.items_count
 
 
 class CartItem(models.Model):
@@ -198,4 +334,4 @@ class Wishlist(models.Model):
         unique_together = ['customer', 'product']
 
     def __str__(self):
-        return f"{self.user.username} - {self.product.name}"
+        return f"{self.customer.user.username} - {self.product.name}"
@@ -0,0 +1,66 @@
+"""Rendered product-page fragments, keyed on per-product version numbers.
+
+The fragment holds everything on the product page that is the same for all
+shoppers. Header parts (cart, wishlist, login state) stay in the outer
+template and are rendered per request. Signals bump a product's version when
+the product, its variants or its images change; category edits are covered
+by the category tree version, which is part of every key.
+"""
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core.cache_versions import bump_version, get_versions
+from products.category_tree import TREE_VERSION
+from products.models import Product
+
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+# Rendered in place of the CSRF token so the fragment can be shared; the
+# view substitutes the visitor's own token on every response.
+CSRF_PLACEHOLDER = 'csrf-token-placeholder'
+
+
+def product_version_name(product_id):
+    return f'product:{product_id}'
+
+
+def invalidate_product(product_id):
+    bump_version(product_version_name(product_id))
+
+
+def fragment_key(product_id):
+    product_version, tree_version = get_versions(
+        product_version_name(product_id), TREE_VERSION
+    )
+    return f'product_body:{product_id}:{product_version}:{tree_version}'
+
+
+def render_product_fragment(product):
+    from products.variant_matrix import get_variant_matrix
+
+    context = {
+        'product': product,
+        'variant_matrix': get_variant_matrix(product.pk),
+        'csrf_token': CSRF_PLACEHOLDER,
+    }
+    return {
+        'title': product.name,
+        'body': render_to_string(
+            'ecommerce/partials/product_body.html', context
+        ),
+    }
+
+
+def get_product_fragment(product_id):
+    """Cached fragment for the product, or None if it does not exist."""
+    key = fragment_key(product_id)
+    fragment = cache.get(key)
+    if fragment is None:
+        product = Product.objects.select_related('category').filter(
+            pk=product_id
+        ).first()
+        if product is None:
+            return None
+        fragment = render_product_fragment(product)
+        cache.set(key, fragment, FRAGMENT_TIMEOUT)
+    return fragment
@@ -0,0 +1,102 @@
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from core.paginator import cached_count
+
+
+CURSOR_SALT = 'products.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset pagination over ``(created_at, id)``, newest first.
+
+    Each page is a range scan that starts right after the last row of the
+    previous one, so deep pages cost the same as the first. Cursors are
+    signed, so clients can't forge arbitrary positions.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by('-created_at', '-id')
+        self.per_page = per_page
+
+    @property
+    def count(self):
+        return cached_count(self.queryset)
+
+    def encode_cursor(self, product, direction):
+        return signing.dumps(
+            [product.created_at.isoformat(), product.pk, direction],
+            salt=CURSOR_SALT,
+        )
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, pk, direction = signing.loads(cursor, salt=CURSOR_SALT)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        created_at = parse_datetime(created_at)
+        if created_at is None or direction not in ('next', 'prev'):
+            raise InvalidCursor(cursor)
+        return created_at, pk, direction
+
+    def page(self, cursor=None):
+        limit = self.per_page + 1
+
+        if not cursor:
+            rows = list(self.queryset[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_next, has_previous = has_more, False
+        else:
+            created_at, pk, direction = self.decode_cursor(cursor)
+            if direction == 'next':
+                rows = list(self.queryset.filter(
+                    Q(created_at__lt=created_at)
+                    | Q(created_at=created_at, id__lt=pk)
+                )[:limit])
+                has_more = len(rows) > self.per_page
+                rows = rows[:self.per_page]
+                has_next, has_previous = has_more, True
+            else:
+                rows = list(self.queryset.filter(
+                    Q(created_at__gt=created_at)
+                    | Q(created_at=created_at, id__gt=pk)
+                ).order_by('created_at', 'id')[:limit])
+                has_more = len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+                has_next, has_previous = True, has_more
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], 'next')
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], 'prev')
+        return CursorPage(rows, self, next_cursor, previous_cursor)
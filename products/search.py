@@ -0,0 +1,286 @@
+"""In-process BM25 search over the product catalog.
+
+The inverted index is held in memory by every worker and persisted to
+``SEARCH_INDEX_PATH`` so a fresh process can load it without touching the
+database. Product, variant and category changes update the local index
+immediately and are remembered as pending. Shortly afterwards the worker
+takes a lock in the shared cache, loads the file as last written by any
+worker, re-indexes its pending products from the database on top of it,
+writes it back and bumps the shared ``search_index`` version so other
+workers reload it. Every worker's changes therefore end up in the file,
+whichever order they are written in. A published index is never modified
+(changes are applied to a copy that replaces it), so searches need no
+lock.
+"""
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from core.cache_versions import bump_version, get_version
+from products.models import Product, ProductVariant
+
+
+INDEX_VERSION = 'search_index'
+SAVE_LOCK_KEY = 'search_index:lock'
+SAVE_LOCK_TIMEOUT = 60
+SAVE_LOCK_POLL_INTERVAL = 0.1
+TOKEN_RE = re.compile(r'\w+')
+NAME_BOOST = 3
+
+_lock = threading.RLock()
+_index = None
+_index_version = None
+_save_timer = None
+# Products re-indexed locally but not yet written to the shared file.
+_pending = set()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class SearchIndex:
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.doc_lengths = {}
+        self.doc_terms = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def copy(self):
+        index = SearchIndex()
+        for term, postings in self.postings.items():
+            index.postings[term] = dict(postings)
+        index.doc_lengths = dict(self.doc_lengths)
+        index.doc_terms = dict(self.doc_terms)
+        index.total_length = self.total_length
+        return index
+
+    def add(self, product_id, tokens):
+        self.remove(product_id)
+        if not tokens:
+            return
+        frequencies = Counter(tokens)
+        for term, frequency in frequencies.items():
+            self.postings[term][product_id] = frequency
+        self.doc_terms[product_id] = tuple(frequencies)
+        self.doc_lengths[product_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, product_id):
+        terms = self.doc_terms.pop(product_id, ())
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(product_id, 0)
+
+    def search(self, query):
+        """Product ids matching any query term, best BM25 score first."""
+        count = len(self.doc_lengths)
+        if not count:
+            return []
+
+        average_length = self.total_length / count
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            frequency = len(postings)
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for product_id, term_frequency in postings.items():
+                length_norm = 1 - self.b + self.b * (
+                    self.doc_lengths[product_id] / average_length
+                )
+                scores[product_id] += idf * (
+                    term_frequency * (self.k1 + 1)
+                    / (term_frequency + self.k1 * length_norm)
+                )
+
+        return sorted(scores, key=lambda pk: (-scores[pk], -pk))
+
+
+def load_documents(product_ids=None):
+    """Token lists for active products, keyed by product id.
+
+    Costs two queries however many products are loaded.
+    """
+    products = Product.objects.filter(is_active=True).select_related(
+        'category'
+    ).only('name', 'description', 'category__name')
+    variants = ProductVariant.objects.filter(
+        is_active=True,
+        product__is_active=True,
+    )
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        variants = variants.filter(product_id__in=product_ids)
+
+    variant_tokens = defaultdict(list)
+    for product_id, color, size in variants.values_list(
+        'product_id', 'color', 'size'
+    ).iterator(chunk_size=5000):
+        variant_tokens[product_id].extend(tokenize(color))
+        variant_tokens[product_id].extend(tokenize(size))
+
+    documents = {}
+    for product in products.iterator(chunk_size=2000):
+        tokens = tokenize(product.name) * NAME_BOOST
+        tokens += tokenize(product.description)
+        if product.category:
+            tokens += tokenize(product.category.name)
+        tokens += variant_tokens.get(product.pk, [])
+        documents[product.pk] = tokens
+    return documents
+
+
+def build_index():
+    index = SearchIndex()
+    for product_id, tokens in load_documents().items():
+        index.add(product_id, tokens)
+    return index
+
+
+def save_index(index):
+    path = settings.SEARCH_INDEX_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, 'wb') as handle:
+        pickle.dump(index, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp, path)
+
+
+def load_index():
+    try:
+        with open(settings.SEARCH_INDEX_PATH, 'rb') as handle:
+            return pickle.load(handle)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def apply_documents(index, product_ids):
+    documents = load_documents(product_ids)
+    for product_id in product_ids:
+        if product_id in documents:
+            index.add(product_id, documents[product_id])
+        else:
+            index.remove(product_id)
+
+
+def get_search_index():
+    global _index, _index_version
+
+    version = get_version(INDEX_VERSION)
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _lock:
+        if _index is None or _index_version != version:
+            index = load_index()
+            if index is None:
+                index = build_index()
+                save_index(index)
+            elif _pending:
+                # Keep local changes that are not in the file yet.
+                apply_documents(index, _pending)
+            _index = index
+            _index_version = version
+        return _index
+
+
+@contextmanager
+def save_lock():
+    """Serialize writes of the index file across workers.
+
+    A holder that dies only blocks the others until the lock expires.
+    """
+    deadline = time.monotonic() + SAVE_LOCK_TIMEOUT
+    while not cache.add(SAVE_LOCK_KEY, 1, SAVE_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            break
+        time.sleep(SAVE_LOCK_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        cache.delete(SAVE_LOCK_KEY)
+
+
+def rebuild_search_index():
+    global _index, _index_version
+
+    with _lock, save_lock():
+        index = build_index()
+        save_index(index)
+        _pending.clear()
+        _index = index
+        _index_version = bump_version(INDEX_VERSION)
+    return index
+
+
+def _persist():
+    global _index, _index_version, _save_timer
+
+    try:
+        with _lock, save_lock():
+            _save_timer = None
+            product_ids = set(_pending)
+            _pending.clear()
+            index = load_index()
+            if index is None:
+                index = build_index()
+            else:
+                apply_documents(index, product_ids)
+            save_index(index)
+            _index = index
+            _index_version = bump_version(INDEX_VERSION)
+    finally:
+        # Runs on a timer thread, which has its own connection.
+        connection.close()
+
+
+def _schedule_persist():
+    # Coalesce bursts of edits (admin bulk actions, imports) into one write.
+    global _save_timer
+
+    if _save_timer is None:
+        _save_timer = threading.Timer(settings.SEARCH_INDEX_SAVE_DELAY, _persist)
+        _save_timer.start()
+
+
+def update_products(product_ids):
+    """Re-index the given products, dropping inactive or deleted ones."""
+    global _index
+
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    with _lock:
+        # Searches read the published index without the lock, so changes
+        # go into a copy that replaces it.
+        index = get_search_index().copy()
+        apply_documents(index, product_ids)
+        _index = index
+        _pending.update(product_ids)
+        _schedule_persist()
+
+
+def search_products(query):
+    return get_search_index().search(query)
@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from products.models import (
+    Cart,
+    CartItem,
+    Category,
+    Product,
+    ProductImage,
+    ProductVariant,
+)
+from products.cart_service import recalculate_cart_totals
+from products.category_tree import invalidate_category_tree
+from products.image_derivatives import schedule_derivatives
+from products.page_cache import invalidate_product
+from products import facets, search
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def sync_cart_totals(sender, instance, **kwargs):
+    # Lines edited outside products.cart_service (admin, cascades) resync
+    # their cart from the lines instead of applying a delta. The service
+    # itself writes lines without sending these signals.
+    recalculate_cart_totals(Cart.objects.filter(pk=instance.cart_id))
+
+
+@receiver(post_save, sender=Product)
+def refresh_cart_prices(sender, instance, created, **kwargs):
+    if created:
+        return
+    cart_ids = CartItem.objects.filter(
+        variant__product=instance
+    ).values('cart_id')
+    recalculate_cart_totals(Cart.objects.filter(pk__in=cart_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def clear_category_tree(sender, instance, **kwargs):
+    # After commit, once Category.save has written the path, so no worker
+    # can rebuild from uncommitted rows and cache them under the new
+    # version.
+    transaction.on_commit(invalidate_category_tree)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_save, sender=Category)
+def generate_image_derivatives(sender, instance, **kwargs):
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: schedule_derivatives(name))
+
+
+def refresh_product_indexes(product_ids):
+    search.update_products(product_ids)
+    facets.update_products(product_ids)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def reindex_product(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: refresh_product_indexes([product_id]))
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def reindex_variant_product(sender, instance, **kwargs):
+    product_id = instance.product_id
+    transaction.on_commit(lambda: refresh_product_indexes([product_id]))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def reindex_category_products(sender, instance, **kwargs):
+    product_ids = list(instance.products.values_list('pk', flat=True))
+    if product_ids:
+        transaction.on_commit(lambda: refresh_product_indexes(product_ids))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def clear_product_page(sender, instance, **kwargs):
+    # Bump after commit so a concurrent request can't cache the old rows
+    # under the new version.
+    product_id = instance.pk
+    transaction.on_commit(lambda: invalidate_product(product_id))
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def clear_parent_product_page(sender, instance, **kwargs):
+    product_id = instance.product_id
+    transaction.on_commit(lambda: invalidate_product(product_id))
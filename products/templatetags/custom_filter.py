@@ -1,6 +1,15 @@
 from django import template
+
+from products.image_derivatives import srcset_for
+
 register = template.Library()
 
 @register.filter
 def reverse_string(value):
     return value[::-1]
+
+
+@register.filter
+def srcset(value):
+    """Responsive ``srcset`` for an image field or a stored image name."""
+    return srcset_for(getattr(value, 'name', value))
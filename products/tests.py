@@ -1,3 +1,204 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from customers.models import Customer
+from products import category_tree, facets
+from products.cart_service import add_item, clear_cart
+from products.models import (
+    Cart,
+    Category,
+    Product,
+    ProductImage,
+    ProductVariant,
+)
+
+
+# The site templates link to Google sign-in, which needs a configured app.
+google_login = override_settings(SOCIALACCOUNT_PROVIDERS={
+    **settings.SOCIALACCOUNT_PROVIDERS,
+    'google': {
+        **settings.SOCIALACCOUNT_PROVIDERS['google'],
+        'APP': {'client_id': 'test', 'secret': 'test'},
+    },
+})
+
+
+def reset_process_indexes():
+    """Drop the process-local category tree and facet index.
+
+    Their shared version counters live in the database cache, which each
+    test rolls back, so a counter can come back at a number an index built
+    by an earlier test already carries.
+    """
+    category_tree._tree = None
+    facets._index = None
+
+
+def seed_catalog(count=6):
+    """Active products in one category, each with an image and two sizes."""
+    category = Category.objects.create(name='Shirts', slug='shirts')
+    products = []
+    for i in range(count):
+        product = Product.objects.create(
+            name=f'Shirt {i}',
+            category=category,
+            buying_price=4,
+            base_price=10 + i,
+        )
+        ProductImage.objects.create(
+            product=product,
+            image=f'products/shirt-{i}.jpg',
+            is_primary=True,
+        )
+        for size in ('M', 'L'):
+            ProductVariant.objects.create(
+                product=product,
+                size=size,
+                color='red' if i % 2 else 'blue',
+                stock=10,
+            )
+        products.append(product)
+    return category, products
+
+
+def fill_cart(client, products):
+    for product in products:
+        client.post(
+            reverse('add_to_cart', args=[product.pk]),
+            {'variant_id': product.variants.first().pk, 'quantity': 1},
+        )
+
+
+@google_login
+class StorefrontQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, cls.products = seed_catalog()
+        cls.user = User.objects.create_user('shopper', 'shopper@example.com', 'pw')
+        Customer.objects.create(user=cls.user)
+
+    def setUp(self):
+        reset_process_indexes()
+        # Budgets are for a signed-in shopper with a cart.
+        self.client.force_login(self.user)
+        fill_cart(self.client, self.products)
+        # Version counters are created in the cache on first use; measure
+        # warm requests, as in production.
+        self.client.get(reverse('product_list'))
+
+    def test_product_list(self):
+        response = self.assertQueryBudget('product_list')
+        self.assertEqual(len(response.context['products']), 3)
+
+    def test_product_list_filtered(self):
+        response = self.assertQueryBudget(
+            'product_list',
+            data={'category': 'shirts', 'size': 'M', 'color': 'red'},
+        )
+        self.assertEqual(response.context['paginator'].count, 3)
+
+    def test_product_detail(self):
+        product = self.products[0]
+        # The first view renders and caches the page fragment.
+        self.client.get(reverse('product_detail', args=[product.pk]))
+        response = self.assertQueryBudget('product_detail', args=[product.pk])
+        self.assertEqual(response.status_code, 200)
+
+    def test_cart(self):
+        response = self.assertQueryBudget('cart')
+        self.assertEqual(len(response.context['items']), len(self.products))
+
+    def test_guest_cart(self):
+        guest = Client()
+        fill_cart(guest, self.products)
+        response = self.assertQueryBudget('cart', client=guest)
+        self.assertEqual(len(response.context['items']), len(self.products))
+
+
+class CartServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _, cls.products = seed_catalog()
+        cls.variants = [product.variants.first() for product in cls.products]
+
+    def setUp(self):
+        self.cart = Cart.objects.create(session_id='test-session')
+
+    def assertTotals(self, items_count, subtotal):
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items_count, items_count)
+        self.assertEqual(self.cart.subtotal, subtotal)
+
+    def test_first_add(self):
+        # UPDATE of a missing line, INSERT and the cart delta (plus the
+        # savepoint pair); no resync.
+        with self.assertNumQueries(5):
+            add_item(self.cart, self.variants[0].pk, 2, Decimal('10'))
+        self.assertEqual(self.cart.items.get().quantity, 2)
+        self.assertTotals(2, Decimal('20'))
+
+    def test_repeat_add(self):
+        add_item(self.cart, self.variants[0].pk, 1, Decimal('10'))
+        with self.assertNumQueries(4):
+            add_item(self.cart, self.variants[0].pk, 3, Decimal('10'))
+        self.assertEqual(self.cart.items.get().quantity, 4)
+        self.assertTotals(4, Decimal('40'))
+
+    def test_clear(self):
+        for variant in self.variants:
+            add_item(self.cart, variant.pk, 1, Decimal('10'))
+        self.assertTotals(len(self.variants), Decimal('60'))
+        # One DELETE and one UPDATE (plus the savepoint pair), however many
+        # lines the cart has.
+        with self.assertNumQueries(4):
+            clear_cart(self.cart)
+        self.assertFalse(self.cart.items.exists())
+        self.assertTotals(0, Decimal('0'))
+
+    def test_admin_edits_resync_totals(self):
+        add_item(self.cart, self.variants[0].pk, 1, Decimal('10'))
+        item = self.cart.items.get()
+        item.quantity = 5
+        item.save()
+        # The resync prices lines from the product: Shirt 0 costs 10.
+        self.assertTotals(5, Decimal('50'))
+
+
+@google_login
+class CategoryListingTests(TestCase):
+    def setUp(self):
+        reset_process_indexes()
+
+    def test_categories_without_path(self):
+        # bulk_create and loaddata skip Category.save, leaving path empty.
+        parent, other = Category.objects.bulk_create([
+            Category(name='Parent', slug='parent'),
+            Category(name='Other', slug='other'),
+        ])
+        child, = Category.objects.bulk_create([
+            Category(name='Child', slug='child', parent=parent),
+        ])
+        for name, category in (('In child', child), ('Elsewhere', other)):
+            Product.objects.create(
+                name=name,
+                category=category,
+                buying_price=4,
+                base_price=10,
+            )
+
+        response = self.client.get(reverse('product_list'), {
+            'category': 'parent',
+        })
+        self.assertEqual(
+            [product.name for product in response.context['products']],
+            ['In child'],
+        )
+        self.assertEqual(
+            set(parent.get_descendants().values_list('slug', flat=True)),
+            {'parent', 'child'},
+        )
@@ -1,6 +1,7 @@
 from django.urls import path
 from products.views import (
     ProductListView,
+    ProductSearchView,
     ProductDetailView,
     CartView,
     WishlistView,
@@ -10,6 +11,7 @@ from products.views import (
 
 urlpatterns = [
     path('', ProductListView.as_view(), name='product_list'),
+    path('search/', ProductSearchView.as_view(), name='product_search'),
     path(
         'product/<int:pk>/',
         ProductDetailView.as_view(),
@@ -0,0 +1,76 @@
+"""Compact per-product view of the active variants.
+
+Holds the distinct sizes and colors, a (size, color) -> variant lookup and
+an availability grid. The rows are cached under the product's version (see
+``products.page_cache``), so any variant change rebuilds the matrix, and
+both the product page and add-to-cart resolve variants without a query.
+"""
+from django.core.cache import cache
+
+from core.cache_versions import get_version
+from products.models import ProductVariant
+from products.page_cache import product_version_name
+
+
+MATRIX_TIMEOUT = 60 * 60 * 24
+
+
+class VariantMatrix:
+    def __init__(self, rows):
+        self.rows = rows
+        self.by_id = {row['id']: row for row in rows}
+        self.sizes = []
+        self.colors = []
+        self.variants = {}
+
+        for row in rows:
+            size = row['size'] or ''
+            color = row['color'] or ''
+            if size and size not in self.sizes:
+                self.sizes.append(size)
+            if color and color not in self.colors:
+                self.colors.append(color)
+            self.variants.setdefault((size, color), row)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def has(self, variant_id):
+        return variant_id in self.by_id
+
+    def resolve(self, size='', color=''):
+        """Id of the first variant matching the given size and/or color."""
+        for row in self.rows:
+            if size and row['size'] != size:
+                continue
+            if color and row['color'] != color:
+                continue
+            return row['id']
+        return None
+
+    @property
+    def availability(self):
+        """``[size, color, in_stock]`` for every combination on offer."""
+        return [
+            [size, color, row['stock'] > 0]
+            for (size, color), row in self.variants.items()
+        ]
+
+
+def matrix_key(product_id):
+    version = get_version(product_version_name(product_id))
+    return f'variant_matrix:{product_id}:{version}'
+
+
+def get_variant_matrix(product_id):
+    key = matrix_key(product_id)
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(
+            ProductVariant.objects.filter(
+                product_id=product_id,
+                is_active=True,
+            ).order_by('id').values('id', 'size', 'color', 'price', 'stock')
+        )
+        cache.set(key, rows, MATRIX_TIMEOUT)
+    return VariantMatrix(rows)
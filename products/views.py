@@ -1,16 +1,36 @@
+from urllib.parse import urlencode
+
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.middleware.csrf import get_token
+from django.utils.safestring import mark_safe
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.contrib import messages
-from django.views.generic import ListView, DetailView
+from django.views.generic import ListView
 from django.db import transaction
 
-from products.models import Product, Cart, CartItem, ProductVariant
+from products.models import (
+    Product,
+    primary_image_subquery,
+)
 
 from products.models import Category
-from customers.models import Customer
+from core.events import emit
+from customers.middleware import get_customer
 from customers.models import Address
+from orders.inventory import InsufficientStock, reserve_stock
 from orders.models import Order, OrderItem, Payment
-from orders.sslcommerz_service import SSLCommerzService
+from orders.notifications import order_confirmation_email
+from orders.payment_service import abort_payment
+from orders.sslcommerz_service import SSLCommerzError, SSLCommerzService
+from products.cart_service import add_item, clear_cart, get_request_cart
+from products.category_tree import get_category_tree
+from products.facets import FACETS, get_facet_index, price_bucket_labels
+from products.page_cache import CSRF_PLACEHOLDER, get_product_fragment
+from products.pagination import CursorPaginator, InvalidCursor
+from products.search import search_products
+from products.variant_matrix import get_variant_matrix
 
 
 class ProductListView(ListView):
@@ -19,49 +39,195 @@ class ProductListView(ListView):
     context_object_name = 'products'
     paginate_by = 3
 
+    def get_selected_facets(self):
+        selected = {}
+        for name, _ in FACETS:
+            values = self.request.GET.getlist(name)
+            if values:
+                selected[name] = values
+        return selected
+
     def get_queryset(self):
+        self.selected_facets = self.get_selected_facets()
+        self.facet_counts = {}
+        # One version check per request; the tree is reused for the context.
+        self.category_tree = get_category_tree()
+
         category_slug = self.request.GET.get("category")
+        qs = Product.objects.filter(is_active=True).select_related('category').with_primary_image().order_by('-created_at', '-id')
+        category_ids = None
         if category_slug:
-            qs = Product.objects.filter(is_active=True, category__slug=category_slug).select_related('category').order_by('-created_at')
+            # Include products filed under any subcategory as well.
+            category = self.category_tree.get(category_slug)
+            if category is None:
+                return qs.none()
+            category_ids = self.category_tree.descendant_ids(category)
+            qs = qs.filter(category_id__in=category_ids)
+
+        index = get_facet_index()
+        if not self.selected_facets:
+            self.facet_counts = index.counts(category_ids)
+            return qs
+
+        product_ids, self.facet_counts = index.filter(
+            self.selected_facets, category_ids
+        )
+        # Filtered listings page through the in-memory id list; only the
+        # products on the current page are fetched.
+        return product_ids
+
+    def use_cursor_pagination(self):
+        # Opt-in keyset mode: ?paginate=cursor, then ?cursor=<token>.
+        return not self.selected_facets and (
+            self.request.GET.get('paginate') == 'cursor'
+            or 'cursor' in self.request.GET
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.use_cursor_pagination():
+            paginator = CursorPaginator(queryset, page_size)
+            try:
+                page = paginator.page(self.request.GET.get('cursor'))
+            except InvalidCursor:
+                raise Http404('Invalid page cursor.')
+            return paginator, page, page.object_list, page.has_other_pages()
+
+        paginator, page, object_list, is_paginated = (
+            super().paginate_queryset(queryset, page_size)
+        )
+        if self.selected_facets:
+            products = (
+                Product.objects.select_related('category')
+                .with_primary_image()
+                .in_bulk(page.object_list)
+            )
+            page.object_list = [
+                products[pk] for pk in page.object_list if pk in products
+            ]
+            object_list = page.object_list
+        return paginator, page, object_list, is_paginated
+
+    def get_facets(self):
+        facets = []
+        for name, label in FACETS:
+            counts = self.facet_counts.get(name, {})
+            selected = self.selected_facets.get(name, [])
+            if name == 'price':
+                values = [
+                    value for value in price_bucket_labels()
+                    if value in counts
+                ]
+            else:
+                values = sorted(counts)
+            options = [
+                {
+                    'value': value,
+                    'count': counts[value],
+                    'selected': value in selected,
+                }
+                for value in values
+                if counts[value] or value in selected
+            ]
+            if options:
+                facets.append(
+                    {'name': name, 'label': label, 'options': options}
+                )
+        return facets
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tree = self.category_tree
+        category = tree.get(self.request.GET.get('category'))
+        context['category'] = category
+        if category:
+            context['breadcrumbs'] = tree.breadcrumbs(category)
+            context['subcategories'] = tree.children(category)
         else:
-            qs = Product.objects.filter(is_active=True).select_related('category').order_by('-created_at')
-        return qs
+            context['breadcrumbs'] = []
+            context['subcategories'] = tree.menu
+        context['facets'] = self.get_facets()
 
+        context['cursor_mode'] = self.use_cursor_pagination()
 
-class ProductDetailView(DetailView):
-    model = Product
-    template_name = 'ecommerce/product.html'
-    context_object_name = 'product'
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        params.pop('cursor', None)
+        if context['cursor_mode']:
+            params['paginate'] = 'cursor'
+        context['querystring'] = params.urlencode()
+        return context
+
+
+class ProductSearchView(View):
+    paginate_by = 12
+
+    def get(self, request):
+        query = (request.GET.get('q') or '').strip()
+        product_ids = search_products(query) if query else []
+
+        paginator = Paginator(product_ids, self.paginate_by)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        products = (
+            Product.objects.filter(is_active=True)
+            .select_related('category')
+            .with_primary_image()
+            .in_bulk(page_obj.object_list)
+        )
+        page_obj.object_list = [
+            products[pk] for pk in page_obj.object_list if pk in products
+        ]
+
+        context = {
+            'products': page_obj.object_list,
+            'page_obj': page_obj,
+            'paginator': paginator,
+            'is_paginated': page_obj.has_other_pages(),
+            'query': query,
+            'querystring': urlencode({'q': query}),
+            'subcategories': get_category_tree().menu,
+        }
+        return render(request, 'ecommerce/category.html', context)
+
+
+class ProductDetailView(View):
+    def get(self, request, pk):
+        fragment = get_product_fragment(pk)
+        if fragment is None:
+            raise Http404('Product not found.')
+
+        body = fragment['body'].replace(CSRF_PLACEHOLDER, get_token(request))
+        context = {
+            'product_title': fragment['title'],
+            'product_body': mark_safe(body),
+        }
+        return render(request, 'ecommerce/product.html', context)
 
 
 class CartView(View):
     def get(self, request):
-        cart = None
         items = []
-
-        if request.user.is_authenticated and not (
-            request.user.is_staff or request.user.is_superuser
-        ):
-            customer, _ = Customer.objects.get_or_create(user=request.user)
-            cart = Cart.objects.filter(customer=customer).first()
-        else:
-            if not request.session.session_key:
-                request.session.create()
-            cart = Cart.objects.filter(
-                session_id=request.session.session_key
-            ).first()
+        cart = get_request_cart(request)
 
         if cart:
-            items = (
+            items = list(
                 cart.items.select_related('variant', 'variant__product')
-                .all()
+                .annotate(
+                    primary_image_name=primary_image_subquery(
+                        'variant__product'
+                    )
+                )
             )
+            for item in items:
+                if item.variant:
+                    item.variant.product.primary_image_name = (
+                        item.primary_image_name
+                    )
 
         context = {
             'cart': cart,
             'items': items,
-            'cart_subtotal': cart.total_price if cart else 0,
-            'cart_total_items': cart.total_items if cart else 0,
+            'cart_subtotal': cart.subtotal if cart else 0,
+            'cart_total_items': cart.items_count if cart else 0,
         }
         return render(request, 'ecommerce/cart.html', context)
 
@@ -74,10 +240,8 @@ class WishlistView(View):
 class CheckoutView(View):
     def get(self, request):
         address = None
-        if request.user.is_authenticated and not (
-            request.user.is_staff or request.user.is_superuser
-        ):
-            customer, _ = Customer.objects.get_or_create(user=request.user)
+        customer = get_customer(request)
+        if customer is not None:
             address = customer.addresses.order_by('-updated_at').first()
 
         context = {
@@ -92,20 +256,8 @@ class CheckoutView(View):
             messages.error(request, 'Please select a payment method.')
             return redirect('checkout')
 
-        cart = None
         cart_items = []
-        if request.user.is_authenticated and not (
-            request.user.is_staff or request.user.is_superuser
-        ):
-            customer, _ = Customer.objects.get_or_create(user=request.user)
-            cart = Cart.objects.filter(customer=customer).first()
-        else:
-            customer = None
-            if not request.session.session_key:
-                request.session.create()
-            cart = Cart.objects.filter(
-                session_id=request.session.session_key
-            ).first()
+        cart = get_request_cart(request)
 
         if cart:
             cart_items = list(
@@ -134,12 +286,9 @@ class CheckoutView(View):
             messages.error(request, 'Street address is required.')
             return redirect('checkout')
 
-        customer = None
         address = None
-        if request.user.is_authenticated and not (
-            request.user.is_staff or request.user.is_superuser
-        ):
-            customer, _ = Customer.objects.get_or_create(user=request.user)
+        customer = get_customer(request)
+        if customer is not None:
             address = customer.addresses.order_by('-updated_at').first()
 
         if address is None:
@@ -159,6 +308,7 @@ class CheckoutView(View):
         address.country = country
         address.save()
 
+        sslcz_service = SSLCommerzService()
         with transaction.atomic():
             order_subtotal = sum((item.subtotal for item in cart_items), 0)
             order = Order.objects.create(
@@ -186,49 +336,81 @@ class CheckoutView(View):
                 payment_type=payment_type,
                 amount=order.total,
                 status=Payment.Status.PENDING,
+                tran_id=(
+                    sslcz_service.generate_tran_id()
+                    if payment_type == 'sslcommerz' else None
+                ),
             )
 
             address.order = order
             address.save(update_fields=['order', 'updated_at'])
 
-            if payment_type == 'sslcommerz':
-                try:
-                    sslcz_service = SSLCommerzService()
-                    tran_id, response = sslcz_service.create_payment_session(
-                        order, customer, address
-                    )
-
-                    payment.tran_id = tran_id
-                    payment.save(update_fields=['tran_id'])
-
-                    if response.get('status') == 'SUCCESS':
-                        gateway_url = response.get('GatewayPageURL')
-                        if gateway_url:
-                            return redirect(gateway_url)
-                        else:
-                            messages.error(
-                                request,
-                                'Payment gateway URL not found.'
-                            )
-                            return redirect('cart')
-                    else:
-                        messages.error(
-                            request,
-                            'Failed to initialize payment session.'
-                        )
-                        return redirect('cart')
-                except Exception as e:
-                    messages.error(
-                        request,
-                        f'Payment initialization error: {str(e)}'
-                    )
-                    return redirect('cart')
-            else:
-                cart.items.all().delete()
-                request.session.pop('payment_type', None)
-                messages.success(request, 'Order placed successfully.')
+            try:
+                reserve_stock(
+                    order,
+                    [
+                        (item.variant_id, item.quantity)
+                        for item in cart_items if item.variant_id
+                    ],
+                    hold=payment_type == 'sslcommerz',
+                )
+            except InsufficientStock:
+                transaction.set_rollback(True)
+                messages.error(
+                    request,
+                    'Some items in your cart are no longer in stock.'
+                )
                 return redirect('cart')
 
+            emit(
+                'order.placed',
+                order_id=order.pk,
+                customer_id=order.customer_id,
+                payment_type=payment_type,
+                total=order.total,
+            )
+            if payment_type == 'cod':
+                clear_cart(cart)
+                if customer is not None and request.user.email:
+                    order_confirmation_email(
+                        order.pk,
+                        order.total,
+                        request.user.email,
+                    ).save()
+
+        if payment_type == 'cod':
+            request.session.pop('payment_type', None)
+            messages.success(request, 'Order placed successfully.')
+            return redirect('cart')
+
+        # The gateway is only called once the order is committed, so a
+        # slow or failing gateway never holds a transaction or stock rows.
+        try:
+            _, response = sslcz_service.create_payment_session(
+                order,
+                customer,
+                address,
+                tran_id=payment.tran_id,
+                num_items=sum(1 for item in cart_items if item.variant_id),
+            )
+        except SSLCommerzError as e:
+            abort_payment(payment, Payment.Status.FAILED, cancel_order=True)
+            messages.error(request, f'Payment initialization error: {str(e)}')
+            return redirect('cart')
+
+        if response.get('status') != 'SUCCESS':
+            abort_payment(payment, Payment.Status.FAILED, cancel_order=True)
+            messages.error(request, 'Failed to initialize payment session.')
+            return redirect('cart')
+
+        gateway_url = response.get('GatewayPageURL')
+        if not gateway_url:
+            abort_payment(payment, Payment.Status.FAILED, cancel_order=True)
+            messages.error(request, 'Payment gateway URL not found.')
+            return redirect('cart')
+
+        return redirect(gateway_url)
+
 
 class AddToCartView(View):
     def post(self, request, product_id):
@@ -256,22 +438,17 @@ class AddToCartView(View):
         if quantity < 1:
             quantity = 1
 
+        matrix = get_variant_matrix(product.pk)
         if variant_id:
-            variant = get_object_or_404(
-                ProductVariant,
-                pk=variant_id,
-                product=product,
-                is_active=True,
-            )
+            try:
+                variant_id = int(variant_id)
+            except ValueError:
+                raise Http404
+            if not matrix.has(variant_id):
+                raise Http404
         else:
-            variants = product.variants.filter(is_active=True)
-            if size:
-                variants = variants.filter(size=size)
-            if color:
-                variants = variants.filter(color=color)
-
-            variant = variants.order_by('id').first()
-            if not variant:
+            variant_id = matrix.resolve(size=size, color=color)
+            if variant_id is None:
                 if size or color:
                     messages.error(
                         request,
@@ -284,27 +461,9 @@ class AddToCartView(View):
                     )
                 return redirect(redirect_url)
 
-        if request.user.is_authenticated and not (
-            request.user.is_staff or request.user.is_superuser
-        ):
-            customer, _ = Customer.objects.get_or_create(user=request.user)
-            cart, _ = Cart.objects.get_or_create(customer=customer)
-        else:
-            if not request.session.session_key:
-                request.session.create()
-            cart, _ = Cart.objects.get_or_create(
-                session_id=request.session.session_key
-            )
+        cart = get_request_cart(request, create=True)
 
-        item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            variant=variant
-        )
-        if created:
-            item.quantity = quantity
-        else:
-            item.quantity = item.quantity + quantity
-        item.save(update_fields=['quantity', 'updated_at'])
+        add_item(cart, variant_id, quantity, product.current_price)
 
         messages.success(request, 'Added to cart.')
         return redirect(redirect_url)
@@ -312,22 +471,11 @@ class AddToCartView(View):
     def get(self, request, product_id):
         redirect_url = request.META.get('HTTP_REFERER')
         product = get_object_or_404(Product, pk=product_id, is_active=True)
-        variant = ProductVariant.objects.filter(product=product).first()
+        variant_id = get_variant_matrix(product.pk).resolve()
+        if variant_id is None:
+            messages.error(request, 'No variant available for this product.')
+            return redirect(redirect_url)
 
-        if request.user.is_authenticated and not (
-            request.user.is_staff or request.user.is_superuser
-        ):
-            customer, _ = Customer.objects.get_or_create(user=request.user)
-            cart, _ = Cart.objects.get_or_create(customer=customer)
-        else:
-            if not request.session.session_key:
-                request.session.create()
-            cart, _ = Cart.objects.get_or_create(
-                session_id=request.session.session_key
-            )
-        _ = CartItem.objects.create(
-            cart=cart,
-            variant=variant,
-            quantity=1
-        )
+        cart = get_request_cart(request, create=True)
+        add_item(cart, variant_id, 1, product.current_price)
         return redirect(redirect_url)